@@ -7,4 +7,4 @@
 # /home/pi/flask_startup.sh &
 
 sleep 10
-cd /home/pi/web-server && sudo python3.7 app.py >>flask.log 2>&1
+cd /home/pi/web-server && sudo python3.7 . --port 80 --threads 8 >>flask.log 2>&1
@@ -0,0 +1,27 @@
+#!/bin/bash
+
+# Notes:
+# Startup benchmark: measures import time of the web server with python -X importtime.
+# Run on the Pi from any directory: /home/pi/import_time.sh [server dir] [budget in ms]
+# Prints total import time and the slowest top-level imports, exits with 1 if budget is exceeded.
+
+SERVER_DIR=${1:-/home/pi/web-server}
+BUDGET_MS=${2:-1000}
+PYTHON=${PYTHON:-python3.7}
+
+cd "$SERVER_DIR" || exit 1
+LOG=$(mktemp)
+$PYTHON -X importtime -c 'import app' 2>"$LOG" || { cat "$LOG"; rm -f "$LOG"; exit 1; }
+
+# importtime lines: "import time: self [us] | cumulative | imported package", nested imports are indented
+TOTAL_MS=$(awk -F'|' '$3 == " app" {print int($2 / 1000)}' "$LOG")
+echo "Slowest imports of app, cumulative ms:"
+awk -F'|' '/^import time: +[0-9]/ && $3 ~ /^ (  )?[^ ]/ && $3 != " app" {printf "%8.1f %s\n", $2 / 1000, $3}' "$LOG" \
+    | sort -rn | head -15
+rm -f "$LOG"
+
+echo "Total: ${TOTAL_MS} ms, budget: ${BUDGET_MS} ms"
+if [ "$TOTAL_MS" -gt "$BUDGET_MS" ]
+then
+    exit 1
+fi
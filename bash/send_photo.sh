@@ -1,5 +1,5 @@
 #!/bin/bash
 
-PATH_TO_PHOTO=`/usr/bin/wget -O - -q -t 1 http://0.0.0.0/api/v1/capture_photo`
-REQUEST='curl -F YOUR_NARODMON_API_KEY=@'$PATH_TO_PHOTO' http://narodmon.ru/post'
-RESULT=`$REQUEST` >/dev/null 2>&1
+# Notes:
+# Streams the camera frame from server memory to NarodMon, no temporary file is written.
+curl -s -f http://0.0.0.0/camera/upload.jpg | curl -s -F 'YOUR_NARODMON_API_KEY=@-;filename=image.jpg' http://narodmon.ru/post >/dev/null 2>&1
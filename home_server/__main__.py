@@ -1 +1,47 @@
-from home_server import db, secure_data, pages
+#!/usr/bin/env python3.7
+
+# Production entry point, run as: python3.7 /home/pi/web-server [--port 80] [--threads 8]
+# One process serves requests on a thread pool, so LoRa, writer, outbox and WU reference run exactly once.
+
+import signal
+from argparse import ArgumentParser
+
+from waitress import serve
+
+from app import app
+from services import start_services, stop_services
+
+
+host = '0.0.0.0'
+port = 80
+threads = 8  # request threads, slow dashboard renders don't hold up sensor POSTs
+connection_limit = 100
+channel_timeout = 30  # seconds, idle keep-alive connections are dropped after
+
+
+def stop_server(signum, frame):
+    raise SystemExit(0)
+
+
+def main():
+    parser = ArgumentParser(description='H.O.M.E. server')
+    parser.add_argument('--host', default=host)
+    parser.add_argument('--port', type=int, default=port)
+    parser.add_argument('--threads', type=int, default=threads)
+    parser.add_argument('--debug', action='store_true', help='werkzeug development server instead of waitress')
+    args = parser.parse_args()
+    signal.signal(signal.SIGTERM, stop_server)  # service manager stops us with SIGTERM, flush before exit
+    start_services()
+    try:
+        if args.debug:
+            # reloader would start background services twice
+            app.run(debug=True, host=args.host, port=args.port, use_reloader=False)
+        else:
+            serve(app, host=args.host, port=args.port, threads=args.threads,
+                  connection_limit=connection_limit, channel_timeout=channel_timeout)
+    finally:
+        stop_services()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,28 +1,33 @@
-#!/usr/bin/env python3.7
-
-from multiprocessing.pool import ThreadPool
+from fnmatch import fnmatch
 
 from flask import Flask
 
 from db.db import init_app
-from lora_reciever import run_lora
+from pages.shared.tools import get_plotly_js
+
+
+versioned_max_age = 60 * 60 * 24 * 365  # seconds, file name changes with its content
+
+
+class HomeServer(Flask):
+    def get_send_file_max_age(self, filename):
+        # only versioned plotly.js is cached for a year, other static files keep Flask default and ETag
+        if filename and fnmatch(filename, 'plotly-*.min.js'):
+            return versioned_max_age
+        return super().get_send_file_max_age(filename)
 
 
-app = Flask(__name__, template_folder='templates')  # firstly, start Flask
+app = HomeServer(__name__, template_folder='templates')  # firstly, start Flask
+init_app(app)
 
-# import all routes
+
+@app.context_processor
+def inject_plotly_js():
+    # called from chart templates only, plotly is loaded by the first chart
+    return {'plotly_js': lambda: get_plotly_js(app.static_folder)}
+
+
+# import all routes, they register themselves on app
 import routes.api
 import routes.pages
 import routes.single_page
-
-
-if __name__ == '__main__':
-    # Start LoRa receiver as subprocess
-    pool = ThreadPool(processes=1)
-    pool.apply_async(run_lora)
-    # Start Flask server
-    init_app(app)
-    app.run(debug=True, host='0.0.0.0', port='80')
-    # Teardown
-    pool.terminate()
-    pool.join()
@@ -0,0 +1,137 @@
+from datetime import datetime
+from os import getcwd, listdir, makedirs, path, remove, rmdir
+from threading import Lock
+
+from camera_service import add_listener, get_variant, variant_makers
+from db.db import SharedConnection
+
+
+archive_period = 5 * 60  # seconds between archived frames
+prune_period = 60 * 60  # seconds between retention passes
+# (age, bucket) in seconds: frames older than age are thinned out to one per bucket, the first one of an hour,
+# of a day the one nearest local noon as in the year timelapse, midnight frame would be black
+retention_tiers = ((60 * 60 * 24, 60 * 60), (60 * 60 * 24 * 30, 60 * 60 * 24))
+# timelapse -> (file name pattern, seconds between frames, local hours to take frames from, frame variant),
+# files are MJPEG. Day movie of full frames is 50-90 MB, of thumbnails 3-5 MB
+timelapses = {'day': ('%Y-%m-%d', archive_period, range(24), 'thumbnail'),
+              'year': ('%Y', 60 * 60 * 24, (12,), 'image')}
+timelapse_retention = {'day': 60 * 60 * 24 * 30}  # seconds, older movies are deleted with the archive tiers
+nearest_limit = 60 * 60 * 12  # seconds, half a day covers the daily tier
+
+
+class CameraArchive(SharedConnection):
+    def __init__(self):
+        super().__init__()
+        self.store_lock = Lock()
+        self.last_stored = 0
+        self.last_pruned = 0
+
+    def store(self, frame, force=False):
+        # camera frame listener, keeps one frame per archive_period unless forced
+        with self.store_lock:
+            if 'archived' in frame:
+                return frame['archived']
+            if not force and frame['time'] - self.last_stored < archive_period:
+                return None
+            unix_ts = int(frame['time'])
+            moment = datetime.fromtimestamp(unix_ts)
+            image = path.join(getcwd(), 'camera', moment.strftime('%Y-%m-%d'), moment.strftime('%H%M%S.jpg'))
+            makedirs(path.dirname(image), exist_ok=True)
+            with open(image, 'wb') as f:
+                f.write(frame['data'])
+            self.execute('INSERT OR REPLACE INTO images(unix_ts,path,size) VALUES(?,?,?);',
+                         (unix_ts, image, len(frame['data'])))
+            frame['archived'] = image
+            self.last_stored = frame['time']
+            self.update_timelapses(frame)
+            if frame['time'] - self.last_pruned >= prune_period:
+                self.prune(frame['time'])
+                self.last_pruned = frame['time']
+            return image
+
+    def prune(self, now):
+        for age, bucket in retention_tiers:
+            cutoff = int(now - age)
+            if bucket < 60 * 60 * 24:
+                kept = f'SELECT min(unix_ts) FROM images WHERE unix_ts < ? GROUP BY unix_ts / {bucket}'
+            else:
+                # bare unix_ts is taken from the row with min() distance to local noon in minutes
+                local = "unix_ts, 'unixepoch', 'localtime'"
+                kept = f'''SELECT unix_ts FROM (SELECT unix_ts, min(abs(strftime('%H', {local}) * 60 +
+                                                                       strftime('%M', {local}) - 720))
+                                                FROM images WHERE unix_ts < ?
+                                                GROUP BY CAST(julianday({local}) + 0.5 AS INTEGER) / {bucket // 86400})'''
+            _, rows = self.execute(f'SELECT unix_ts, path FROM images WHERE unix_ts < ? AND unix_ts NOT IN ({kept});',
+                                   (cutoff, cutoff))
+            for row in rows:
+                try:
+                    remove(row['path'])
+                except FileNotFoundError:
+                    pass
+            with self.lock:
+                connection = self.get_connection()
+                connection.executemany('DELETE FROM images WHERE unix_ts = ?;', [(row['unix_ts'],) for row in rows])
+                connection.commit()
+            for folder in {path.dirname(row['path']) for row in rows}:
+                try:
+                    rmdir(folder)
+                except OSError:
+                    pass  # day folder still has kept frames
+        self.prune_timelapses(now)
+
+    def prune_timelapses(self, now):
+        # only few movies per timelapse folder, listing it is cheap
+        for name, age in timelapse_retention.items():
+            pattern = timelapses[name][0]
+            folder = path.join(getcwd(), 'camera', 'timelapse', name)
+            try:
+                movies = listdir(folder)
+            except FileNotFoundError:
+                continue
+            for movie in movies:
+                try:
+                    moment = datetime.strptime(path.splitext(movie)[0], pattern)
+                except ValueError:
+                    continue  # not a timelapse file
+                if moment.timestamp() < now - age:
+                    remove(path.join(folder, movie))
+
+    def update_timelapses(self, frame=None):
+        # appends frames archived since the last run, the archive folder is never scanned,
+        # current frame variants come from its cache instead of the disk
+        for name, (pattern, step, hours, variant) in timelapses.items():
+            _, state = self.execute('SELECT last_ts FROM timelapses WHERE name = ?;', (name,))
+            last_ts = state[0]['last_ts'] if state else 0
+            _, rows = self.execute('SELECT unix_ts, path FROM images WHERE unix_ts > ? ORDER BY unix_ts;', (last_ts,))
+            for row in rows:
+                moment = datetime.fromtimestamp(row['unix_ts'])
+                if row['unix_ts'] - last_ts < step * 0.9 or moment.hour not in hours:
+                    continue
+                movie = path.join(getcwd(), 'camera', 'timelapse', name, f'{moment.strftime(pattern)}.mjpeg')
+                makedirs(path.dirname(movie), exist_ok=True)
+                if frame is not None and row['path'] == frame.get('archived'):
+                    data = get_variant(frame, variant)
+                else:
+                    try:
+                        with open(row['path'], 'rb') as image:
+                            data = variant_makers[variant](image.read())
+                    except FileNotFoundError:
+                        continue
+                with open(movie, 'ab') as f:
+                    f.write(data)  # MJPEG is plain sequence of JPEG frames
+                last_ts = row['unix_ts']
+            self.execute('''INSERT INTO timelapses(name,last_ts) VALUES(?,?)
+                            ON CONFLICT(name) DO UPDATE SET last_ts = excluded.last_ts;''', (name, last_ts))
+
+    def get_image_at(self, unix_ts):
+        # nearest archived photo, None if there is nothing within nearest_limit
+        _, rows = self.execute('''SELECT * FROM (SELECT * FROM images WHERE unix_ts <= ? ORDER BY unix_ts DESC LIMIT 1)
+                                  UNION ALL
+                                  SELECT * FROM (SELECT * FROM images WHERE unix_ts > ? ORDER BY unix_ts LIMIT 1);''',
+                               (unix_ts, unix_ts))
+        rows = [row for row in rows if abs(row['unix_ts'] - unix_ts) <= nearest_limit]
+        return min(rows, key=lambda row: abs(row['unix_ts'] - unix_ts), default=None)
+
+
+camera_archive = CameraArchive()
+add_listener(camera_archive.store)
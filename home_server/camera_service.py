@@ -0,0 +1,209 @@
+from collections import deque
+from io import BytesIO
+from queue import Empty, Queue
+from threading import Event, Lock, Thread
+from time import monotonic, time
+
+
+resolution = (1280, 720)  # lower resolution to fit in 1mb limitation
+warmup_time = 2  # seconds for exposure and white balance to settle after camera is opened
+capture_period = 60  # seconds between scheduled frames
+frames_kept = 10  # rotating buffer of last frames
+capture_timeout = 30  # seconds caller waits for a fresh frame
+upload_limit = 1000 * 1000  # bytes, WU webcam drops bigger images
+upload_quality = 85  # first try when frame has to be recompressed to fit upload_limit
+thumbnail_size = (320, 180)
+thumbnail_quality = 70
+fake_camera = False  # development box without picamera, never set on the Pi
+
+listeners = []  # listener(frame) is called on camera thread for every new frame
+
+
+def add_listener(listener):
+    listeners.append(listener)
+
+
+class FakeCamera:
+    # stands in for PiCamera on development box (fake_camera) and in tests (factory=FakeCamera)
+    def __init__(self):
+        self.resolution = resolution
+        self.preview = False
+        self.frames = 0
+
+    def start_preview(self):
+        self.preview = True
+
+    def stop_preview(self):
+        self.preview = False
+
+    def capture(self, output, format='jpeg', **options):
+        from PIL import Image
+
+        self.frames += 1
+        shade = self.frames * 16 % 256  # every frame differs, so stale ones are easy to spot
+        Image.new('RGB', tuple(self.resolution), (shade, shade, shade)).save(output, format=format)
+
+    def close(self):
+        self.preview = False
+
+
+def make_camera():
+    if fake_camera:
+        return FakeCamera()
+    from picamera import PiCamera  # missing picamera fails the capture, broken Pi must not look healthy
+
+    return PiCamera()
+
+
+class CameraService:
+    # the only owner of the camera: scheduled and requested captures run one by one on its thread
+    def __init__(self, factory=make_camera):
+        self.factory = factory
+        self.camera = None
+        self.frames = deque(maxlen=frames_kept)
+        self.frames_lock = Lock()
+        self.requests = Queue()
+        self.stopped = Event()
+        self.thread = None
+        self.start_lock = Lock()
+
+    def start(self):
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = Thread(target=self.run, name='camera', daemon=True)
+                self.thread.start()
+
+    def stop(self, timeout=None):
+        self.stopped.set()
+        self.requests.put(None)
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def latest(self):
+        with self.frames_lock:
+            return self.frames[-1] if self.frames else None
+
+    def get_frame(self, max_age=None, timeout=capture_timeout):
+        # buffered frame if it is fresh enough, otherwise waits for a new capture
+        frame = self.latest()
+        if frame is not None and max_age is not None and time() - frame['time'] <= max_age:
+            return frame
+        return self.capture(timeout)
+
+    def capture(self, timeout=capture_timeout):
+        self.start()
+        request = {'done': Event(), 'frame': None}
+        self.requests.put(request)
+        if not request['done'].wait(timeout) or request['frame'] is None:
+            raise RuntimeError('No camera frame', f'{timeout}')
+        return request['frame']
+
+    def run(self):
+        deadline = monotonic()
+        while not self.stopped.is_set():
+            try:
+                requests = [self.requests.get(timeout=max(deadline - monotonic(), 0))]
+            except Empty:
+                requests = []  # scheduled capture
+            if None in requests:
+                break
+            # callers queued before the shot get the same frame
+            while not self.requests.empty():
+                request = self.requests.get_nowait()
+                if request is None:
+                    self.stopped.set()
+                    break
+                requests.append(request)
+            frame = self.shoot()
+            deadline = monotonic() + capture_period
+            for request in requests:
+                request['frame'] = frame
+                request['done'].set()
+        self.close()
+
+    def shoot(self):
+        try:
+            if self.camera is None:
+                self.camera = self.factory()
+                self.camera.resolution = resolution
+                self.camera.start_preview()  # preview keeps sensor running, so exposure stays settled
+                self.stopped.wait(warmup_time)
+            output = BytesIO()
+            self.camera.capture(output, format='jpeg')
+        except Exception as error:
+            print(f'Camera capture failed: {error}')  # debug
+            self.close()  # reopened on next capture
+            return None
+        frame = {'time': time(), 'data': output.getvalue(), 'variants': {}}
+        with self.frames_lock:
+            self.frames.append(frame)
+        for listener in listeners:
+            try:
+                listener(frame)
+            except Exception as error:
+                print(f'Camera listener failed: {error}')  # debug
+        return frame
+
+    def close(self):
+        if self.camera is None:
+            return
+        try:
+            self.camera.stop_preview()
+            self.camera.close()
+        except Exception as error:
+            print(f'Camera close failed: {error}')  # debug
+        self.camera = None
+
+
+def fit_upload(data):
+    if len(data) <= upload_limit:
+        return data  # original goes as is, no second JPEG encode
+    from PIL import Image
+
+    image = Image.open(BytesIO(data))
+    quality = upload_quality
+    while True:
+        output = BytesIO()
+        image.save(output, format='jpeg', quality=quality, optimize=True)
+        if output.tell() <= upload_limit or quality <= 40:
+            return output.getvalue()
+        quality -= 15
+
+
+def make_thumbnail(data):
+    from PIL import Image
+
+    image = Image.open(BytesIO(data))
+    image.draft('RGB', thumbnail_size)  # JPEG decoder scales down while decoding, much cheaper than full decode
+    image.thumbnail(thumbnail_size)
+    output = BytesIO()
+    image.save(output, format='jpeg', quality=thumbnail_quality)
+    return output.getvalue()
+
+
+variant_makers = {'image': bytes, 'upload': fit_upload, 'thumbnail': make_thumbnail}
+variants_lock = Lock()
+
+
+def get_variant(frame, name):
+    # every variant is encoded once per frame and shared by all uploads and pages
+    with variants_lock:
+        variants = frame['variants']
+        if name not in variants:
+            variants[name] = variant_makers[name](frame['data'])
+        return variants[name]
+
+
+camera_service = CameraService()
+
+
+def start_camera():
+    camera_service.start()
+
+
+def stop_camera():
+    camera_service.stop()
+
+
+def get_frame(max_age=None):
+    return camera_service.get_frame(max_age)
@@ -0,0 +1,34 @@
+from functools import partial
+from threading import RLock
+
+
+pool_connections = 4  # hosts kept alive at the same time
+pool_maxsize = 4  # keep-alive connections per host, one per concurrent upload is enough
+http_timeout = 15  # seconds, default for every request of the shared session
+
+# clients live for the whole process, so DNS, TCP and TLS setup is paid once
+clients = {}
+clients_lock = RLock()  # factory may take other clients, e.g. the session
+
+
+def get_client(name, factory):
+    with clients_lock:
+        if name not in clients:
+            clients[name] = factory()
+        return clients[name]
+
+
+def make_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.request = partial(session.request, timeout=http_timeout)  # requests has no session wide timeout
+    return session
+
+
+def get_session():
+    return get_client('http', make_session)
@@ -0,0 +1,64 @@
+from binascii import crc_hqx
+from struct import Struct
+
+# Binary sensor frame, little endian:
+#   header  | 1 byte marker (0xA0 | version), 1 byte device type, 2 bytes sequence number
+#   payload | fixed per (version, device type), see schemas
+#   trailer | 2 bytes CRC-16/CCITT of header and payload
+# Legacy text packets start with an ASCII digit, so the marker never clashes with them.
+
+frame_marker = 0xA0
+frame_version = 1
+header = Struct('<BBH')
+trailer = Struct('<H')
+
+# (version, device type) -> (table, payload struct, scale of every value)
+schemas = {
+    (1, 0): ('wind_data', Struct('<13H'), (100,) * 12 + (10,)),  # speeds * 100, heading * 10
+    (1, 1): ('power_data', Struct('<4f'), (1,) * 4),
+}
+
+
+def is_frame(payload):
+    return len(payload) >= header.size + trailer.size and payload[0] & 0xF0 == frame_marker
+
+
+def crc(data):
+    return crc_hqx(data, 0xFFFF)
+
+
+def encode_frame(device_type, sequence, values, version=frame_version):
+    _, body, scales = schemas[(version, device_type)]
+    frame = bytearray(header.size + body.size + trailer.size)
+    header.pack_into(frame, 0, frame_marker | version, device_type, sequence & 0xFFFF)
+    body.pack_into(frame, header.size, *(round(value * scale) if scale != 1 else value
+                                         for value, scale in zip(values, scales)))
+    trailer.pack_into(frame, header.size + body.size, crc(frame[:header.size + body.size]))
+    return bytes(frame)
+
+
+def decode_frame(payload):
+    # returns (table, device type, sequence, values), raises ValueError on broken or unknown frame
+    view = memoryview(payload)
+    if not is_frame(view):
+        raise ValueError('Not a frame', bytes(view[:4]).hex())
+    marker, device_type, sequence = header.unpack_from(view, 0)
+    schema = schemas.get((marker & 0x0F, device_type))
+    if schema is None:
+        raise ValueError('Unknown frame schema', f'{marker & 0x0F}/{device_type}')
+    table, body, scales = schema
+    end = header.size + body.size
+    if len(view) < end + trailer.size:
+        raise ValueError('Short frame', len(view))
+    if trailer.unpack_from(view, end)[0] != crc(view[:end]):
+        raise ValueError('Bad frame CRC', bytes(view[:end + trailer.size]).hex())
+    values = tuple(value / scale if scale != 1 else value
+                   for value, scale in zip(body.unpack_from(view, header.size), scales))
+    return table, device_type, sequence, values
+
+
+def packet_key(payload):
+    # frames carry a sequence number, text packets are deduplicated by content
+    if is_frame(payload):
+        return payload[1], int.from_bytes(payload[2:4], 'little')
+    return hash(bytes(payload))
@@ -1,20 +1,60 @@
 import sqlite3
+from queue import LifoQueue, Empty, Full
+from threading import Lock
 
 import click
 from flask import current_app, g
 from flask.cli import with_appcontext
 
+from db.retention import compact, enable_incremental_vacuum, raw_retention_days
+from db.rollups import resolutions, rollup_params, rebuild_rollups
+
 
 data_update_period = 5
+db_name = "flask_db"
+pool_size = 4
+
+# connections are kept between requests, so every one keeps its cache of prepared statements
+pool = LifoQueue(maxsize=pool_size)
+
+
+def connect():
+    connection = sqlite3.connect(
+        db_name,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        check_same_thread=False
+    )
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+class SharedConnection:
+    # connection of a background service outside of app context, its threads take turns under the lock
+    def __init__(self):
+        self.connection = None
+        self.lock = Lock()
+
+    def get_connection(self):
+        # caller holds the lock
+        if self.connection is None:
+            self.connection = connect()
+        return self.connection
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            connection = self.get_connection()
+            cur = connection.execute(sql, params)
+            rows = cur.fetchall()
+            connection.commit()
+            return cur, rows
 
 
 def get_db():
     if 'db' not in g:
-        g.db = sqlite3.connect(
-            "flask_db",
-            detect_types=sqlite3.PARSE_DECLTYPES
-        )
-        g.db.row_factory = sqlite3.Row
+        try:
+            g.db = pool.get_nowait()
+        except Empty:
+            g.db = connect()
 
     return g.db
 
@@ -23,14 +63,43 @@ def close_db(e=None):
     db = g.pop('db', None)
 
     if db is not None:
-        db.close()
+        if db.in_transaction:
+            db.rollback()
+        try:
+            pool.put_nowait(db)
+        except Full:
+            db.close()
 
 
 def init_db():
     db = get_db()
 
-    with current_app.open_resource('schema.sql') as f:
+    with current_app.open_resource('db/schema.sql') as f:
         db.executescript(f.read().decode('utf8'))
+    enable_incremental_vacuum(db)
+
+
+def migrate_db():
+    db = get_db()
+
+    # precip was stored by ingest, but missing in the old schema
+    columns = [row['name'] for row in db.execute('PRAGMA table_info(weather_data);')]
+    if 'precip' not in columns:
+        db.execute('ALTER TABLE weather_data ADD COLUMN precip DOUBLE;')
+
+    with current_app.open_resource('db/migrations.sql') as f:
+        db.executescript(f.read().decode('utf8'))
+
+    # rollups are maintained on ingest, history before the migration or a new resolution has to be folded once
+    stored = {row[0] for row in db.execute('SELECT DISTINCT resolution FROM rollups;')}
+    for resolution in stored - set(resolutions):
+        db.execute('DELETE FROM rollups WHERE resolution = ?;', (resolution,))
+    missing = [resolution for resolution in resolutions if resolution not in stored]
+    if missing:
+        for table in rollup_params:
+            rebuild_rollups(db, table, names=missing)
+    db.commit()
+    enable_incremental_vacuum(db)
 
 
 @click.command('init-db')
@@ -41,6 +110,25 @@ def init_db_command():
     click.echo('Initialized the database.')
 
 
+@click.command('migrate-db')
+@with_appcontext
+def migrate_db_command():
+    """Upgrade existing tables and indexes, keeping the data."""
+    migrate_db()
+    click.echo('Migrated the database.')
+
+
+@click.command('compact-db')
+@click.option('--days', default=raw_retention_days, show_default=True, help='Days of raw rows to keep.')
+@with_appcontext
+def compact_db_command(days):
+    """Drop raw rows older than retention period, history stays in rollups."""
+    removed = compact(get_db(), days)
+    click.echo(f'Compacted the database, removed rows: {removed}.')
+
+
 def init_app(app):
     app.teardown_appcontext(close_db)
     app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_db_command)
+    app.cli.add_command(compact_db_command)
@@ -0,0 +1,28 @@
+from threading import Lock
+from time import time
+
+
+# last committed row for every (table, meas_type), fed by ingest writer
+latest = {}
+latest_lock = Lock()
+
+
+def update_latest(table, row):
+    key = (table, row.get('meas_type'))
+    with latest_lock:
+        current = latest.get(key)
+        # backfilled rows may arrive out of order, never replace newer reading
+        if current is None or current['unix_ts'] <= row['unix_ts']:
+            latest[key] = row
+
+
+def get_latest(table, meas_type=None):
+    with latest_lock:
+        row = latest.get((table, meas_type))
+    return dict(row) if row else None
+
+
+def get_latest_age(table, meas_type=None):
+    with latest_lock:
+        row = latest.get((table, meas_type))
+    return time() - row['unix_ts'] if row else None
@@ -0,0 +1,43 @@
+CREATE TABLE IF NOT EXISTS rollups (
+    table_name VARCHAR NOT NULL,
+    meas_type INTEGER NOT NULL,
+    param VARCHAR NOT NULL,
+    resolution VARCHAR NOT NULL,
+    bucket_ts INTEGER NOT NULL,
+    min_value DOUBLE,
+    max_value DOUBLE,
+    sum_value DOUBLE,
+    count INTEGER,
+    PRIMARY KEY (table_name, param, meas_type, resolution, bucket_ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    service VARCHAR NOT NULL,
+    unix_ts INTEGER NOT NULL,
+    meas_type INTEGER NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS images (
+    unix_ts INTEGER PRIMARY KEY,
+    path VARCHAR NOT NULL,
+    size INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS timelapses (
+    name VARCHAR PRIMARY KEY,
+    last_ts INTEGER NOT NULL
+) WITHOUT ROWID;
+
+-- readings resent by nodes are stored once, duplicates stored before are dropped
+DELETE FROM weather_data WHERE id NOT IN (SELECT min(id) FROM weather_data GROUP BY meas_type, unix_ts);
+DROP INDEX IF EXISTS weather_data_meas_type_unix_ts;
+CREATE UNIQUE INDEX IF NOT EXISTS weather_data_meas_type_unix_ts_key ON weather_data(meas_type, unix_ts);
+CREATE INDEX IF NOT EXISTS weather_data_unix_ts ON weather_data(unix_ts);
+CREATE INDEX IF NOT EXISTS wind_data_unix_ts ON wind_data(unix_ts);
+CREATE INDEX IF NOT EXISTS power_data_unix_ts ON power_data(unix_ts);
+CREATE INDEX IF NOT EXISTS outbox_next_attempt ON outbox(next_attempt);
+
+ANALYZE;
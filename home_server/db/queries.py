@@ -1,103 +1,366 @@
-from db.db import get_db, close_db
+import math
+from datetime import datetime
+from time import time
+
+from db.db import get_db, connect
+from db.latest import get_latest, get_latest_age, update_latest
+from db.rollups import resolutions, target_points, aggregate_for, rollup_params, update_rollups
+from db.writer import get_writer, add_listener
 
 data_update_period = 5
 
 
-def store_weather_data(data):
-    connection = get_db()
-    sql = f'''INSERT INTO weather_data(ts,unix_ts,meas_type,
-                                       temperature,humidity,pressure,dew_point,
-                                       precip,uv) VALUES({data});'''
-    cur = connection.cursor()
-    cur.execute(sql)
-    connection.commit()
-    close_db()
-    return cur.lastrowid
+tables = {
+    'weather_data': ('ts', 'unix_ts', 'meas_type',
+                     'temperature', 'humidity', 'pressure', 'dew_point',
+                     'precip', 'uv'),
+    'wind_data': ('ts', 'unix_ts',
+                  'avg_rps', 'max_rps', 'min_rps',
+                  'avg_ms', 'max_ms', 'min_ms',
+                  'avg_kmh', 'max_kmh', 'min_kmh',
+                  'avg_knots', 'max_knots', 'min_knots',
+                  'heading', 'heading_abbr'),
+    'power_data': ('ts', 'unix_ts', 'avg_voltage', 'avg_current', 'avg_power', 'avg_consumption')
+}
+snapshot_offsets = {'last_day': 60 * 60 * 24, 'last_year': 60 * 60 * 24 * 365}  # seconds before snapshot time
+latest_keys = (('weather_data', 0), ('weather_data', 1), ('wind_data', None), ('power_data', None))
+integer_columns = ('id', 'unix_ts', 'meas_type')
+text_columns = ('heading_abbr',)
 
+unique_keys = {'weather_data': ('meas_type', 'unix_ts')}  # readings resent by nodes are stored once
 
-def store_wind_data(data):
-    connection = get_db()
-    sql = f'''INSERT INTO wind_data(ts,unix_ts,
-                                    avg_rps,max_rps,min_rps,
-                                    avg_ms,max_ms,min_ms,
-                                    avg_kmh,max_kmh,min_knh,
-                                    avg_knots,max_knots,min_knots,
-                                    heading,heading_abbr) VALUES({data});'''
-    cur = connection.cursor()
-    cur.execute(sql)
-    connection.commit()
-    close_db()
-    return cur.lastrowid
+# built once, so sqlite statement cache is hit on every insert
+insert_sql = {table: f'''INSERT {'OR IGNORE ' if table in unique_keys else ''}INTO {table}({','.join(columns)})
+                         VALUES({','.join('?' * len(columns))});'''
+              for table, columns in tables.items()}
 
 
-def store_power_data(data):
-    connection = get_db()
-    sql = f'''INSERT INTO wind_data(ts,unix_ts,avg_voltage,avg_current,avg_power,avg_consumption) VALUES({data});'''
-    cur = connection.cursor()
-    cur.execute(sql)
-    connection.commit()
-    close_db()
+def check_param(table, param=None):
+    if table not in tables:
+        raise ValueError('Wrong table', f'{table}')
+    if param is not None and param not in tables[table]:
+        raise ValueError('Wrong param', f'{param}')
+
+
+def decode_value(column, value):
+    if value is None or column == 'ts':
+        return value
+    if column in integer_columns:
+        return int(value)
+    if column in text_columns:
+        return str(value).strip()
+    return float(value)
+
+
+def decode_row(table, row):
+    return {column: decode_value(column, row[column]) for column in ('id',) + tables[table]}
+
+
+def parse_row(table, timestamp, unix_timestamp, data):
+    # data is CSV sent by sensor, extra trailing fields (i.e. RTC time) are ignored
+    return build_row(table, timestamp, unix_timestamp, str(data).split(','))
+
+
+def build_row(table, timestamp, unix_timestamp, values):
+    check_param(table)
+    columns = tables[table][2:]
+    if len(values) < len(columns):
+        raise ValueError('Wrong data', f'{values}')
+    return (timestamp, unix_timestamp) + tuple(decode_value(column, value) for column, value in zip(columns, values))
+
+
+def store_data(table, row):
+    check_param(table)
+    get_writer().put(insert_data, table, row)
+
+
+def store_data_many(table, rows):
+    # returns writer result to wait for, None if there is nothing to store
+    check_param(table)
+    if rows:
+        return get_writer().put_many(insert_data_many, table, rows)
+    return None
+
+
+def store_weather_data(row):
+    store_data('weather_data', row)
+
+
+def store_wind_data(row):
+    store_data('wind_data', row)
+
+
+def store_power_data(row):
+    store_data('power_data', row)
+
+
+def insert_data(connection, table, row):
+    cur = connection.execute(insert_sql[table], row)
+    if cur.rowcount:  # ignored duplicate is already counted in rollups
+        update_rollups(connection, table, dict(zip(tables[table], row)))
     return cur.lastrowid
 
 
-def get_one_measurement(table, param, offset, meas_type):
-    connection = get_db()
-    criteria = f'WHERE meas_type = \'{meas_type}\'' if meas_type else ''
-    sql = f''' SELECT {param} FROM {table} {criteria} ORDER BY RowId DESC LIMIT 2 OFFSET {offset}; '''
-    cur = connection.cursor()
-    cur.execute(sql)
-    row = cur.fetchone()
+def insert_data_many(connection, table, rows):
+    rows = new_rows(connection, table, rows)
+    connection.executemany(insert_sql[table], rows)
+    for row in rows:
+        update_rollups(connection, table, dict(zip(tables[table], row)))
+
+
+def new_rows(connection, table, rows):
+    # rows of a resent batch which are stored already, executemany can't tell which ones were ignored
+    if table not in unique_keys:
+        return rows
+    columns = tables[table]
+    indexes = [columns.index(column) for column in unique_keys[table]]
+    stamps = [row[columns.index('unix_ts')] for row in rows]
+    sql = f''' SELECT {','.join(unique_keys[table])} FROM {table} WHERE unix_ts BETWEEN ? AND ?; '''
+    seen = {tuple(key) for key in connection.execute(sql, (min(stamps), max(stamps)))}
+    fresh = []
+    for row in rows:
+        key = tuple(row[index] for index in indexes)
+        if key not in seen:
+            seen.add(key)
+            fresh.append(row)
+    return fresh
+
+
+def get_one_measurement(table, param, offset, meas_type=None):
+    check_param(table, param)
+    row = get_last_measurement_pack(table, offset, meas_type)
     if row:
-        retval = dict(zip(row.keys(), row))[param]
+        retval = row[param]
     else:
         retval = 0
     return retval
 
 
-def get_last_measurement_pack(table, offset, meas_type=None):
-    connection = get_db()
-    criteria = f'WHERE meas_type = \'{meas_type}\'' if meas_type else ''
-    sql = f''' SELECT * FROM {table} {criteria} ORDER BY RowId DESC LIMIT 2 OFFSET {offset}; '''
-    cur = connection.cursor()
-    cur.execute(sql)
+def get_last_measurement_pack(table, offset, meas_type=None, connection=None):
+    check_param(table)
+    connection = connection or get_db()
+    if meas_type is not None:
+        sql = f''' SELECT * FROM {table} WHERE meas_type = ? ORDER BY unix_ts DESC LIMIT 1 OFFSET ?; '''
+        cur = connection.execute(sql, (int(meas_type), int(offset)))
+    else:
+        sql = f''' SELECT * FROM {table} ORDER BY unix_ts DESC LIMIT 1 OFFSET ?; '''
+        cur = connection.execute(sql, (int(offset),))
     row = cur.fetchone()
     if row:
-        retval = dict(zip(row.keys(), row))
+        retval = decode_row(table, row)
     else:
         retval = 0
     return retval
 
 
+def get_measurement_at(table, unix_ts, meas_type=None, connection=None):
+    check_param(table)
+    connection = connection or get_db()
+    if meas_type is not None:
+        sql = f''' SELECT * FROM {table} WHERE meas_type = ? AND unix_ts = ? LIMIT 1; '''
+        cur = connection.execute(sql, (int(meas_type), int(unix_ts)))
+    else:
+        sql = f''' SELECT * FROM {table} WHERE unix_ts = ? LIMIT 1; '''
+        cur = connection.execute(sql, (int(unix_ts),))
+    row = cur.fetchone()
+    return decode_row(table, row) if row else None
+
+
+def remember_latest(table, data):
+    update_latest(table, dict(zip(tables[table], data)))
+
+
+add_listener(remember_latest)
+
+
+def warm_latest():
+    connection = connect()
+    for table, meas_type in latest_keys:
+        row = get_last_measurement_pack(table, 0, meas_type, connection=connection)
+        if row:
+            update_latest(table, row)
+    connection.close()
+
+
+def get_latest_measurement(table, meas_type=None):
+    # served from memory, disk is touched only if nothing was stored since startup
+    check_param(table)
+    meas_type = int(meas_type) if meas_type is not None else None
+    row = get_latest(table, meas_type)
+    if row is None:
+        row = get_last_measurement_pack(table, 0, meas_type)
+        if not row:
+            return empty_row(table)
+        update_latest(table, row)
+    return row
+
+
+def get_measurement_age(table, meas_type=None):
+    check_param(table)
+    meas_type = int(meas_type) if meas_type is not None else None
+    if get_latest(table, meas_type) is None:
+        get_latest_measurement(table, meas_type)
+    return get_latest_age(table, meas_type)
+
+
+def empty_row(table):
+    return {column: 0 for column in tables[table]}
+
+
+def rollup_snapshot_sql(table):
+    # hourly aggregates pivoted to one row with the columns of a raw snapshot row,
+    # they stand in for raw rows older than retention period
+    params = rollup_params[table]
+    values = []
+    for column in ('id',) + tables[table]:
+        if column in params:
+            values.append(f"max(CASE WHEN param = '{column}' THEN {aggregate_for(column)} END) AS {column}")
+        elif column in ('unix_ts', 'meas_type'):
+            values.append(f"{'bucket_ts' if column == 'unix_ts' else 'meas_type'} AS {column}")
+        else:
+            values.append(f"{'NULL' if column == 'ts' else '0'} AS {column}")  # NULL skips timestamp converter
+    return f'''SELECT * FROM (SELECT ? AS slot, {','.join(values)} FROM rollups
+                              WHERE table_name = '{table}' AND param IN ({','.join(f"'{param}'" for param in params)})
+                              AND meas_type = ? AND resolution = 'hour' AND bucket_ts =
+                              (SELECT max(bucket_ts) FROM rollups WHERE table_name = '{table}'
+                               AND param = '{params[0]}' AND meas_type = ? AND resolution = 'hour' AND bucket_ts <= ?)
+                              GROUP BY bucket_ts)'''
+
+
+def get_snapshot(table, meas_types=(None,), at=None):
+    # current, previous and rows at the comparison time points for every meas_type in one query
+    check_param(table)
+    connection = get_db()
+    at = int(at or time())
+    columns = ','.join(('id',) + tables[table])
+    parts = []
+    params = []
+    for meas_type in meas_types:
+        criteria = 'meas_type = ? AND' if meas_type is not None else ''
+        type_params = [int(meas_type)] if meas_type is not None else []
+        parts.append(f'''SELECT * FROM (SELECT ? AS slot, {columns} FROM {table}
+                                         WHERE {criteria} unix_ts <= ? ORDER BY unix_ts DESC LIMIT 2)''')
+        params += ['current'] + type_params + [at]
+        for slot, offset in snapshot_offsets.items():
+            parts.append(f'''SELECT * FROM (SELECT ? AS slot, {columns} FROM {table}
+                                             WHERE {criteria} unix_ts <= ? ORDER BY unix_ts DESC LIMIT 1)''')
+            params += [slot] + type_params + [at - offset]
+            if table in rollup_params:
+                parts.append(rollup_snapshot_sql(table))
+                params += [f'{slot}_rollup', int(meas_type or 0), int(meas_type or 0), at - offset]
+    sql = ' UNION ALL '.join(parts) + ';'
+    snapshot = {meas_type: {'latest': []} for meas_type in meas_types}
+    rollups = {meas_type: {} for meas_type in meas_types}
+    for row in connection.execute(sql, params):
+        meas_type = row['meas_type'] if None not in meas_types else None
+        slots = snapshot[meas_type]
+        if row['slot'] == 'current':
+            slots['latest'].append(decode_row(table, row))
+        elif row['slot'].endswith('_rollup'):
+            data = decode_row(table, row)
+            data['ts'] = datetime.fromtimestamp(data['unix_ts'])
+            rollups[meas_type][row['slot'][:-len('_rollup')]] = data
+        else:
+            slots[row['slot']] = decode_row(table, row)
+    for meas_type, slots in snapshot.items():
+        latest = sorted(slots.pop('latest'), key=lambda data: data['unix_ts'], reverse=True)
+        latest += [empty_row(table)] * (2 - len(latest))
+        slots['current'], slots['previous'] = latest
+        for slot in snapshot_offsets:
+            if slot not in slots:
+                slots[slot] = rollups[meas_type].get(slot) or empty_row(table)
+    return snapshot
+
+
 def get_one_last_average_measurement(table, param, period, meas_type=None):
+    check_param(table, param)
     connection = get_db()
-    criteria = f'WHERE meas_type = \'{meas_type}\'' if meas_type else ''
-    number = str(2 + (period / data_update_period))
-    sql = f''' avg({param}) from (SELECT {param} FROM {table} {criteria} ORDER BY RowId DESC  LIMIT {number}); '''
-    cur = connection.cursor()
-    cur.execute(sql)
+    end = int(time())
+    start = end - period * 60
+    if meas_type is not None:
+        sql = f''' SELECT avg({param}) FROM {table} WHERE meas_type = ? AND unix_ts BETWEEN ? AND ?; '''
+        cur = connection.execute(sql, (int(meas_type), start, end))
+    else:
+        sql = f''' SELECT avg({param}) FROM {table} WHERE unix_ts BETWEEN ? AND ?; '''
+        cur = connection.execute(sql, (start, end))
     row = cur.fetchone()
-    if cur.rowcount > 0:
-        retval = dict(zip(row.keys(), row))[param]
+    if row and row[0] is not None:
+        retval = row[0]
     else:
         retval = 0
     return retval
 
 
-def get_last_series_measurement(table, param, period, meas_type=None):
+def get_series_measurement(table, param, start, end, meas_type=None):
+    check_param(table, param)
+    connection = get_db()
+    if meas_type is not None:
+        sql = f''' SELECT ts, {param} FROM {table}
+                   WHERE meas_type = ? AND unix_ts BETWEEN ? AND ? ORDER BY unix_ts; '''
+        cur = connection.execute(sql, (int(meas_type), int(start), int(end)))
+    else:
+        sql = f''' SELECT ts, {param} FROM {table} WHERE unix_ts BETWEEN ? AND ? ORDER BY unix_ts; '''
+        cur = connection.execute(sql, (int(start), int(end)))
+    x = []
+    y = []
+    for row in cur:
+        x.append(row[0])
+        y.append(row[1])
+    return x, y
+
+
+def iter_series_measurement(table, param, start, end, resolution=None, meas_type=None):
+    # yields (unix_ts, value) straight from the cursor, nothing is collected in memory
+    check_param(table, param)
     connection = get_db()
-    criteria = f'WHERE meas_type = \'{meas_type}\'' if meas_type else ''
-    number = int(period / data_update_period)
-    sql = f''' SELECT ts, {param} FROM {table} {criteria} ORDER BY RowId DESC  LIMIT {number}; '''
-    cur = connection.cursor()
-    cur.execute(sql)
-
-    columns = [column[0] for column in cur.description]
-    results = []
-    for row in cur.fetchall():
-        results.append(dict(zip(columns, row)))
+    if resolution:
+        if resolution not in resolutions:
+            raise ValueError('Wrong resolution', f'{resolution}')
+        sql = f''' SELECT bucket_ts, {aggregate_for(param)} FROM rollups
+                   WHERE table_name = ? AND param = ? AND meas_type = ? AND resolution = ?
+                   AND bucket_ts BETWEEN ? AND ? ORDER BY bucket_ts; '''
+        cur = connection.execute(sql, (table, param, int(meas_type or 0), resolution, int(start), int(end)))
+    elif meas_type is not None:
+        sql = f''' SELECT unix_ts, {param} FROM {table}
+                   WHERE meas_type = ? AND unix_ts BETWEEN ? AND ? ORDER BY unix_ts; '''
+        cur = connection.execute(sql, (int(meas_type), int(start), int(end)))
+    else:
+        sql = f''' SELECT unix_ts, {param} FROM {table} WHERE unix_ts BETWEEN ? AND ? ORDER BY unix_ts; '''
+        cur = connection.execute(sql, (int(start), int(end)))
+    for row in cur:
+        yield row[0], row[1]
+
+
+def get_rollup_series_measurement(table, param, start, end, resolution, meas_type=None):
     x = []
     y = []
-    for result in results:
-        x.append(result['ts'])
-        y.append(result[param])
+    for bucket_ts, value in iter_series_measurement(table, param, start, end, resolution, meas_type):
+        x.append(datetime.fromtimestamp(bucket_ts))
+        y.append(value)
     return x, y
+
+
+def pick_resolution(period):
+    # period in minutes, None means raw rows are few enough to plot as is
+    raw_step = 60 * data_update_period
+    seconds = period * 60
+    if seconds / raw_step <= 2 * target_points:
+        return None
+    best = None
+    best_distance = None
+    for resolution, size in resolutions.items():
+        points = seconds / max(size, raw_step)
+        distance = abs(math.log(points / target_points))
+        if best_distance is None or distance < best_distance:
+            best, best_distance = resolution, distance
+    return best
+
+
+def get_last_series_measurement(table, param, period, meas_type=None):
+    end = int(time())
+    start = end - period * 60
+    resolution = pick_resolution(period)
+    if resolution:
+        return get_rollup_series_measurement(table=table, param=param, start=start, end=end,
+                                             resolution=resolution, meas_type=meas_type)
+    return get_series_measurement(table=table, param=param, start=start, end=end, meas_type=meas_type)
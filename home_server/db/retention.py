@@ -0,0 +1,100 @@
+from threading import Event, Thread
+from time import sleep, time
+
+from db.rollups import rebuild_rollups, rollup_params
+
+
+raw_retention_days = 180  # raw rows older than this are dropped, hour and day rollups keep the history
+half_hour_retention_days = 90  # half hours are charted for a month at most, coarser rollups keep the history
+chunk_size = 1000  # rows per delete, every chunk is a short transaction, so ingest never waits long
+chunk_pause = 0.1  # seconds between chunks, writer thread takes the lock meanwhile
+vacuum_pages = 256  # pages given back to the file system per step
+retention_period = 60 * 60 * 24  # seconds between scheduled runs
+
+stopped = Event()
+retention_thread = None
+
+
+def enable_incremental_vacuum(connection):
+    # auto_vacuum can't be switched on a database with tables without full VACUUM, done once
+    if connection.execute('PRAGMA auto_vacuum;').fetchone()[0] != 2:
+        connection.commit()
+        connection.execute('PRAGMA auto_vacuum = INCREMENTAL;')
+        connection.execute('VACUUM;')
+
+
+def delete_chunks(connection, sql, params):
+    # sql deletes at most chunk_size rows per call, repeated until nothing is left
+    removed = 0
+    while True:
+        count = connection.execute(sql, params + (chunk_size,)).rowcount
+        connection.commit()
+        removed += count
+        if count < chunk_size:
+            return removed
+        sleep(chunk_pause)
+
+
+def drop_raw_rows(connection, table, cutoff):
+    # rollups are updated on ingest, older history is folded once before raw rows are gone
+    if not connection.execute('SELECT 1 FROM rollups WHERE table_name = ? LIMIT 1;', (table,)).fetchone():
+        rebuild_rollups(connection, table)
+        connection.commit()
+    return delete_chunks(connection, f'''DELETE FROM {table} WHERE id IN
+                                         (SELECT id FROM {table} WHERE unix_ts < ? LIMIT ?);''', (cutoff,))
+
+
+def drop_half_hour_rollups(connection, cutoff):
+    return delete_chunks(connection, '''DELETE FROM rollups WHERE (table_name,param,meas_type,resolution,bucket_ts) IN
+                                        (SELECT table_name,param,meas_type,resolution,bucket_ts FROM rollups
+                                         WHERE resolution = 'half_hour' AND bucket_ts < ? LIMIT ?);''', (cutoff,))
+
+
+def vacuum(connection):
+    # free pages go back in small steps, full VACUUM would lock the database for minutes
+    if connection.execute('PRAGMA auto_vacuum;').fetchone()[0] != 2:
+        return  # incremental_vacuum does nothing until enable_incremental_vacuum
+    free = connection.execute('PRAGMA freelist_count;').fetchone()[0]
+    while free:
+        # executescript runs the pragma to the end, execute() frees only one page per call
+        connection.executescript(f'PRAGMA incremental_vacuum({vacuum_pages});')
+        left = connection.execute('PRAGMA freelist_count;').fetchone()[0]
+        if left >= free:
+            return  # nothing more is given back
+        free = left
+        sleep(chunk_pause)
+
+
+def compact(connection, days=raw_retention_days, half_hour_days=half_hour_retention_days):
+    # returns number of removed rows per table
+    now = int(time())
+    removed = {table: drop_raw_rows(connection, table, now - days * 60 * 60 * 24) for table in rollup_params}
+    removed['rollups'] = drop_half_hour_rollups(connection, now - half_hour_days * 60 * 60 * 24)
+    vacuum(connection)
+    connection.execute('PRAGMA wal_checkpoint(TRUNCATE);').fetchall()
+    connection.execute('PRAGMA optimize;')
+    return removed
+
+
+def run_retention():
+    from db.db import connect  # db.db registers CLI from this module
+
+    while not stopped.wait(retention_period):
+        connection = connect()
+        try:
+            compact(connection)
+        except Exception as error:
+            print(f'Retention failed: {error}')  # debug
+        finally:
+            connection.close()
+
+
+def start_retention():
+    global retention_thread
+    if retention_thread is None:
+        retention_thread = Thread(target=run_retention, name='retention', daemon=True)
+        retention_thread.start()
+
+
+def stop_retention():
+    stopped.set()
@@ -0,0 +1,65 @@
+# bucket size in seconds for every maintained resolution, finest first. Raw rows come every 5 minutes,
+# so finer buckets would only copy them: month chart takes half hours, year chart six hours
+resolutions = {'half_hour': 60 * 30, 'hour': 60 * 60, 'six_hours': 60 * 60 * 6, 'day': 60 * 60 * 24}
+target_points = 1500
+
+rollup_params = {
+    'weather_data': ('temperature', 'humidity', 'pressure', 'dew_point', 'precip', 'uv'),
+    'wind_data': ('avg_rps', 'max_rps', 'min_rps',
+                  'avg_ms', 'max_ms', 'min_ms',
+                  'avg_kmh', 'max_kmh', 'min_kmh',
+                  'avg_knots', 'max_knots', 'min_knots'),
+    'power_data': ('avg_voltage', 'avg_current', 'avg_power', 'avg_consumption')
+}
+
+upsert_sql = '''INSERT INTO rollups(table_name,meas_type,param,resolution,bucket_ts,
+                                    min_value,max_value,sum_value,count) VALUES(?,?,?,?,?,?,?,?,1)
+                ON CONFLICT(table_name,meas_type,param,resolution,bucket_ts) DO UPDATE SET
+                    min_value = min(min_value, excluded.min_value),
+                    max_value = max(max_value, excluded.max_value),
+                    sum_value = sum_value + excluded.sum_value,
+                    count = count + 1;'''
+
+
+def update_rollups(connection, table, row):
+    # row is a dict of inserted values, caller commits together with the raw row
+    if table not in rollup_params:
+        return
+    meas_type = row.get('meas_type', 0)
+    values = []
+    for resolution, size in resolutions.items():
+        bucket_ts = row['unix_ts'] - row['unix_ts'] % size
+        for param in rollup_params[table]:
+            value = row[param]
+            if value is None:
+                continue
+            values.append((table, meas_type, param, resolution, bucket_ts, value, value, value))
+    connection.executemany(upsert_sql, values)
+
+
+def rebuild_rollups(connection, table, start=0, names=tuple(resolutions)):
+    meas_type = 'meas_type' if table == 'weather_data' else '0'
+    for resolution in names:
+        size = resolutions[resolution]
+        bucket_start = start - start % size
+        connection.execute('DELETE FROM rollups WHERE table_name = ? AND resolution = ? AND bucket_ts >= ?;',
+                           (table, resolution, bucket_start))
+        for param in rollup_params[table]:
+            connection.execute(f'''INSERT INTO rollups(table_name,meas_type,param,resolution,bucket_ts,
+                                                       min_value,max_value,sum_value,count)
+                                   SELECT ?, {meas_type}, ?, ?, unix_ts - unix_ts % {size},
+                                          min({param}), max({param}), total({param}), count({param})
+                                   FROM {table}
+                                   WHERE unix_ts >= ? AND {param} IS NOT NULL
+                                   GROUP BY 2, 5;''',
+                               (table, param, resolution, bucket_start))
+
+
+def aggregate_for(param):
+    # keep gusts and lows visible, everything else is averaged
+    if param.startswith('max_'):
+        return 'max_value'
+    if param.startswith('min_'):
+        return 'min_value'
+    return 'sum_value / count'
+
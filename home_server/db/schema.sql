@@ -1,6 +1,12 @@
+PRAGMA auto_vacuum = INCREMENTAL;  -- applies to a new database file, init-db switches existing ones
+
 DROP TABLE IF EXISTS weather_data;
 DROP TABLE IF EXISTS wind_data;
 DROP TABLE IF EXISTS power_data;
+DROP TABLE IF EXISTS rollups;
+DROP TABLE IF EXISTS outbox;
+DROP TABLE IF EXISTS images;
+DROP TABLE IF EXISTS timelapses;
 
 CREATE TABLE weather_data (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -11,6 +17,7 @@ CREATE TABLE weather_data (
     humidity DOUBLE,
     pressure DOUBLE,
     dew_point DOUBLE,
+    precip DOUBLE,
     uv DOUBLE
 );
 
@@ -42,4 +49,43 @@ CREATE TABLE power_data (
     avg_current DOUBLE,
     avg_power DOUBLE,
     avg_consumption DOUBLE
-);
\ No newline at end of file
+);
+
+CREATE TABLE rollups (
+    table_name VARCHAR NOT NULL,
+    meas_type INTEGER NOT NULL,
+    param VARCHAR NOT NULL,
+    resolution VARCHAR NOT NULL,
+    bucket_ts INTEGER NOT NULL,
+    min_value DOUBLE,
+    max_value DOUBLE,
+    sum_value DOUBLE,
+    count INTEGER,
+    PRIMARY KEY (table_name, param, meas_type, resolution, bucket_ts)
+) WITHOUT ROWID;
+
+CREATE TABLE outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    service VARCHAR NOT NULL,
+    unix_ts INTEGER NOT NULL,
+    meas_type INTEGER NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt INTEGER NOT NULL
+);
+
+CREATE TABLE images (
+    unix_ts INTEGER PRIMARY KEY,
+    path VARCHAR NOT NULL,
+    size INTEGER NOT NULL
+);
+
+CREATE TABLE timelapses (
+    name VARCHAR PRIMARY KEY,
+    last_ts INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE UNIQUE INDEX weather_data_meas_type_unix_ts_key ON weather_data(meas_type, unix_ts);  -- resent readings are stored once
+CREATE INDEX weather_data_unix_ts ON weather_data(unix_ts);
+CREATE INDEX wind_data_unix_ts ON wind_data(unix_ts);
+CREATE INDEX power_data_unix_ts ON power_data(unix_ts);
+CREATE INDEX outbox_next_attempt ON outbox(next_attempt);
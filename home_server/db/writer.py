@@ -0,0 +1,171 @@
+import atexit
+import sqlite3
+from queue import Queue, Empty
+from threading import Event, Lock, Thread
+from time import monotonic, sleep
+
+from db.db import connect
+
+
+batch_size = 50  # rows per group commit
+commit_interval = 2.0  # seconds, max time a row waits in memory
+retry_delay = 0.1  # seconds, doubled after every busy database error
+max_retry_delay = 5
+commit_retries = 5  # then rows stay pending until the next commit
+
+writer = None
+writer_lock = Lock()
+listeners = []  # listener(table, data) is called for every row once it is committed
+
+
+class IngestWriter:
+    def __init__(self, size=batch_size, interval=commit_interval):
+        self.size = size
+        self.interval = interval
+        self.queue = Queue()
+        self.thread = Thread(target=self.run, name='ingest-writer', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def put(self, insert, table, data):
+        # insert(connection, table, data) runs on the writer thread, commit is up to the writer
+        self.queue.put((insert, table, data, (data,), None))
+
+    def put_many(self, insert, table, rows):
+        # insert(connection, table, rows) stores all rows at once, they land in the same transaction;
+        # returned result gets 'stored' and 'done' set once rows are committed or dropped
+        result = {'done': Event(), 'stored': False}
+        self.queue.put((insert, table, rows, rows, result))
+        return result
+
+    def flush(self, timeout=None):
+        done = Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout=None):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+    def connect(self):
+        connection = connect()
+        connection.execute('PRAGMA journal_mode=WAL;')
+        connection.execute('PRAGMA synchronous=NORMAL;')  # WAL stays consistent, fsync only on checkpoint
+        return connection
+
+    def run(self):
+        # never exits but on None, errors are reported and rows are kept for the next commit
+        connection = self.connect()
+        pending = []  # items stored in the open transaction
+        deadline = None
+        while True:
+            timeout = max(deadline - monotonic(), 0) if pending else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except Empty:
+                item = ()
+            try:
+                if not item:
+                    self.commit(connection, pending)
+                    if item is None:
+                        break
+                    continue
+                if isinstance(item, Event):
+                    self.commit(connection, pending)
+                    item.set()
+                    continue
+                if not self.store(connection, item):
+                    continue
+                if not pending:
+                    deadline = monotonic() + self.interval
+                pending.append(item)
+                # caller waits for its result, no point to keep rows for the group commit
+                if item[4] is not None or sum(len(rows) for _, _, _, rows, _ in pending) >= self.size:
+                    self.commit(connection, pending)
+            except Exception as error:
+                print(f'Ingest writer failed: {error}')  # debug
+                if item is None:
+                    break
+        connection.close()
+
+    def store(self, connection, item):
+        insert, table, data, rows, result = item
+        if not connection.in_transaction:
+            connection.execute('BEGIN;')  # items are grouped into one transaction until commit
+        delay = retry_delay
+        while True:
+            connection.execute('SAVEPOINT item;')  # failed item must not leave half of its rows behind
+            try:
+                insert(connection, table, data)
+            except sqlite3.Error as error:
+                connection.execute('ROLLBACK TO item;')
+                connection.execute('RELEASE item;')
+                if is_busy(error):
+                    sleep(delay)
+                    delay = min(delay * 2, max_retry_delay)
+                    continue
+                print(f'Failed to store {table} row {data}: {error}')  # debug
+                if result is not None:
+                    result['done'].set()
+                return False
+            connection.execute('RELEASE item;')
+            return True
+
+    def commit(self, connection, pending):
+        if not pending:
+            return True
+        delay = retry_delay
+        for attempt in range(commit_retries):
+            try:
+                connection.commit()
+                break
+            except sqlite3.Error as error:
+                print(f'Ingest commit failed: {error}')  # debug
+                if not connection.in_transaction:
+                    self.replay(connection, pending)  # transaction was rolled back, rows have to be stored again
+                sleep(delay)
+                delay = min(delay * 2, max_retry_delay)
+        else:
+            return False  # rows stay pending, commit is retried with the next item
+        for _, table, _, rows, result in pending:
+            for data in rows:
+                for listener in listeners:
+                    try:
+                        listener(table, data)
+                    except Exception as error:
+                        print(f'Ingest listener failed: {error}')  # debug
+            if result is not None:
+                result['stored'] = True
+                result['done'].set()
+        pending.clear()
+        return True
+
+    def replay(self, connection, pending):
+        pending[:] = [item for item in pending if self.store(connection, item)]
+
+
+def is_busy(error):
+    # other connections (retention, outbox, camera archive) may hold the write lock for a while
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in str(error) or 'busy' in str(error))
+
+
+def add_listener(listener):
+    listeners.append(listener)
+
+
+def get_writer():
+    global writer
+    with writer_lock:
+        if writer is None:
+            writer = IngestWriter()
+            writer.start()
+            atexit.register(stop_writer)
+    return writer
+
+
+def stop_writer():
+    # flush everything queued and release the connection, safe to call on shutdown
+    if writer is not None:
+        writer.stop()
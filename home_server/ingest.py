@@ -0,0 +1,64 @@
+from datetime import datetime
+from time import time
+
+from codec import is_frame, decode_frame
+from db.queries import build_row, parse_row, store_data, store_data_many
+from pages.shared.tools import deg_to_heading
+
+
+# LoRa device id (first CSV field) -> table
+lora_tables = {'0': 'wind_data', '1': 'power_data'}
+batch_limit = 1000  # readings per batch request
+clock_skew = 5 * 60  # seconds, readings further in the future are rejected
+store_timeout = 30  # seconds batch request waits for its rows to be committed
+
+
+def ingest(table, data):
+    # shared by HTTP endpoints and LoRa receiver: parse sensor CSV and queue row to the writer,
+    # never waits for disk, raises ValueError on malformed data
+    row = parse_row(table, datetime.now(), int(time()), data)
+    store_data(table, row)
+    return row
+
+
+def ingest_many(table, readings):
+    # readings buffered by a node: [{'unix_ts': ..., 'data': csv}, ...], all valid ones are stored in one
+    # transaction, returns status of every reading in the same order once rows are committed
+    if len(readings) > batch_limit:
+        raise ValueError('Too many readings', f'{len(readings)}')
+    now = time()
+    rows = []
+    results = []
+    for reading in readings:
+        try:
+            unix_ts = int(reading.get('unix_ts', now))
+            if not 0 < unix_ts < now + clock_skew:
+                raise ValueError('Wrong timestamp', f'{unix_ts}')
+            row = parse_row(table, datetime.fromtimestamp(unix_ts), unix_ts, reading['data'])
+        except (AttributeError, KeyError, TypeError, ValueError) as error:
+            results.append({'status': 400, 'error': str(error)})
+            continue
+        rows.append(row)
+        results.append({'status': 201, 'unix_ts': unix_ts})
+    stored = store_data_many(table, rows)
+    if stored is not None and not (stored['done'].wait(store_timeout) and stored['stored']):
+        for result in results:
+            if result['status'] == 201:
+                result.update(status=503, error='Not stored, send again')
+    return results
+
+
+def ingest_lora(payload):
+    # payload is raw packet: binary frame or legacy "<device id>,<csv>" text
+    if is_frame(payload):
+        table, device_type, sequence, values = decode_frame(payload)
+        if table == 'wind_data':
+            values += (deg_to_heading(values[-1]),)
+        row = build_row(table, datetime.now(), int(time()), values)
+        store_data(table, row)
+        return row
+    text = bytes(payload).decode("utf-8", 'ignore')
+    table = lora_tables.get(text[:1])
+    if table is None or text[1:2] != ',':
+        raise ValueError('Unknown packet', f'{text}')
+    return ingest(table, text[2:])
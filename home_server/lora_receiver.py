@@ -1,53 +1,81 @@
-from time import sleep
+from collections import OrderedDict, deque
+from threading import Event
+from time import monotonic, time
 
-import requests
 from SX127x.LoRa import *
 from SX127x.board_config import BOARD
 
+from codec import packet_key
+from ingest import ingest_lora
 
-endpoint = "http://0.0.0.0:80/api/v1"
+
+dedup_window = 5  # seconds, nodes may repeat a packet to get it through
+packets_kept = 100  # radio stats of last packets, served by /api/v1/lora_stats
+
+receiver = None
+
+
+class PacketFilter:
+    def __init__(self, window=dedup_window):
+        self.window = window
+        self.seen = OrderedDict()  # key -> time of first receive
+
+    def is_duplicate(self, key):
+        now = monotonic()
+        while self.seen and next(iter(self.seen.values())) < now - self.window:
+            self.seen.popitem(last=False)
+        return key in self.seen
+
+    def add(self, key):
+        # only stored packets are remembered, corrupted one must not hide its valid repeat
+        self.seen[key] = monotonic()
 
 
 class LoRaRcvCont(LoRa):
     def __init__(self, verbose=False):
         super(LoRaRcvCont, self).__init__(verbose)
         self.set_mode(MODE.SLEEP)
-        self.set_dio_mapping([0] * 6)
+        self.set_dio_mapping([0] * 6)  # DIO0 raises RxDone, on_rx_done is called from GPIO interrupt
+        self.stopped = Event()
+        self.packet_filter = PacketFilter()
+        self.packets = deque(maxlen=packets_kept)
 
     def start(self):
         self.reset_ptr_rx()
         self.set_mode(MODE.RXCONT)
-        while True:
-            sleep(.5)
-            rssi_value = self.get_rssi_value()
-            status = self.get_modem_status()
-            sys.stdout.flush()
+        self.stopped.wait()  # nothing to poll, radio wakes us up via DIO0
+
+    def stop(self):
+        self.stopped.set()
 
     def on_rx_done(self):
         self.clear_irq_flags(RxDone=1)
-        payload = self.read_payload(nocheck=True)
-        formatted_payload = bytes(payload).decode("utf-8", 'ignore')
-        status = self.send_to_home(formatted_payload)
-        if status:
-            sleep(1)  # we got the data, force sleep for a while to skip repeats
+        payload = bytes(self.read_payload(nocheck=True))
+        key = packet_key(payload)
+        duplicate = self.packet_filter.is_duplicate(key)
+        self.packets.append({'time': time(), 'rssi': self.get_pkt_rssi_value(), 'snr': self.get_pkt_snr_value(),
+                             'length': len(payload), 'duplicate': duplicate})
+        if not duplicate and self.send_to_home(payload):
+            self.packet_filter.add(key)
         self.set_mode(MODE.SLEEP)
         self.reset_ptr_rx()
         self.set_mode(MODE.RXCONT)
 
     def send_to_home(self, payload):
-        if str(payload[:2]) == '0,':
-            requests.post(url=f'{endpoint}/add_wind_data', json={'data': payload})
-        elif str(payload[:2]) == '1,':
-            requests.post(url=f'{endpoint}/add_power_data', json={'data': payload})
-        else:
-            print("Garbage collected, ignoring")  # debug
+        # handed to the ingest writer queue in-process, no HTTP loopback
+        try:
+            ingest_lora(payload)
             status = 1
+        except ValueError as error:
+            print(f"Garbage collected, ignoring: {error}")  # debug
+            status = 0
         return status
 
 
 def run_lora():
+    global receiver
     BOARD.setup()
-    lora = LoRaRcvCont(verbose=False)
+    receiver = lora = LoRaRcvCont(verbose=False)
     lora.set_mode(MODE.STDBY)
     # Medium Range  Defaults after init are 434.0MHz, Bw = 125 kHz, Cr = 4/5, Sf = 128chips/symbol, CRC on 13 dBm
     lora.set_pa_config(pa_select=1)
@@ -58,3 +86,23 @@ def run_lora():
     finally:
         lora.set_mode(MODE.SLEEP)
         BOARD.teardown()
+
+
+def summarize(values):
+    return {'min': min(values), 'avg': round(sum(values) / len(values), 1), 'max': max(values)} if values else None
+
+
+def get_stats():
+    # RSSI and SNR of last packets and their summary, None until receiver runs
+    if receiver is None:
+        return None
+    packets = list(receiver.packets)  # copied in one step, radio interrupt appends meanwhile
+    return {'count': len(packets), 'duplicates': sum(packet['duplicate'] for packet in packets),
+            'rssi': summarize([packet['rssi'] for packet in packets]),
+            'snr': summarize([packet['snr'] for packet in packets]),
+            'packets': packets}
+
+
+def stop_lora():
+    if receiver is not None:
+        receiver.stop()
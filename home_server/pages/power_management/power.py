@@ -1,11 +1,11 @@
 from flask import render_template
 
-from db.queries import get_last_measurement_pack, get_one_measurement
+from db.queries import get_latest_measurement
 
 
 def power_page():
-    power_data = get_last_measurement_pack('power_data', '0')
-    wind_speed = get_one_measurement('wind_data', 'avg_kmh', '0')
+    power_data = get_latest_measurement('power_data')
+    wind_speed = get_latest_measurement('wind_data')['avg_kmh']
 
     return render_template("power_management/power_dashboard.html",
                            avg_voltage=power_data['avg_voltage'],
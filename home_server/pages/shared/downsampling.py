@@ -0,0 +1,81 @@
+from array import array
+from datetime import datetime
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, pure python path is just slower
+    numpy = None
+
+
+def to_number(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def lttb_indexes(x, y, threshold):
+    # Largest-Triangle-Three-Buckets, first and last points are always kept
+    length = len(y)
+    bucket_size = (length - 2) / (threshold - 2)
+    indexes = [0]
+    selected = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, length)
+        if numpy is not None:
+            avg_x = x[end:next_end].mean()
+            avg_y = y[end:next_end].mean()
+            areas = numpy.abs((x[selected] - avg_x) * (y[start:end] - y[selected]) -
+                              (x[selected] - x[start:end]) * (avg_y - y[selected]))
+            selected = start + int(areas.argmax())
+        else:
+            count = next_end - end
+            avg_x = sum(x[end:next_end]) / count
+            avg_y = sum(y[end:next_end]) / count
+            max_area = -1.0
+            for i in range(start, end):
+                area = abs((x[selected] - avg_x) * (y[i] - y[selected]) - (x[selected] - x[i]) * (avg_y - y[selected]))
+                if area > max_area:
+                    max_area = area
+                    selected = i
+        indexes.append(selected)
+    indexes.append(length - 1)
+    return indexes
+
+
+def min_max_indexes(y, threshold):
+    # envelope: min and max of every bucket in time order, so peaks (i.e. wind gusts) survive
+    length = len(y)
+    buckets = max(threshold // 2, 1)
+    bucket_size = length / buckets
+    indexes = []
+    for bucket in range(buckets):
+        start = int(bucket * bucket_size)
+        end = max(int((bucket + 1) * bucket_size), start + 1)
+        if numpy is not None:
+            low = start + int(y[start:end].argmin())
+            high = start + int(y[start:end].argmax())
+        else:
+            values = y[start:end]
+            low = start + values.index(min(values))
+            high = start + values.index(max(values))
+        indexes += sorted({low, high})
+    return indexes
+
+
+def downsample(x, y, threshold, envelope=False):
+    points = [(x_value, y_value) for x_value, y_value in zip(x, y) if y_value is not None]
+    if threshold < 3 or len(points) <= threshold:
+        return [point[0] for point in points], [point[1] for point in points]
+    if numpy is not None:
+        x_values = numpy.fromiter((to_number(point[0]) for point in points), dtype=float, count=len(points))
+        y_values = numpy.fromiter((point[1] for point in points), dtype=float, count=len(points))
+    else:
+        x_values = array('d', (to_number(point[0]) for point in points))
+        y_values = array('d', (point[1] for point in points))
+    if envelope:
+        indexes = min_max_indexes(y_values, threshold)
+    else:
+        indexes = lttb_indexes(x_values, y_values, threshold)
+    return [points[i][0] for i in indexes], [points[i][1] for i in indexes]
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+
+cache_size = 8 * 1024 * 1024  # bytes of rendered figures kept in memory
+# one new row barely changes long charts, so they are rebuilt at most once per this many seconds
+refresh_periods = {'week': 15 * 60, 'month': 60 * 60, 'year': 6 * 60 * 60}
+
+
+class FigureCache:
+    def __init__(self, max_bytes=cache_size):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()  # (table, param, period, height, width) -> (figure, created)
+        self.changed = {}  # table -> time of last committed row
+        self.lock = Lock()
+
+    def get(self, key):
+        table, period = key[0], key[2]
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            figure, created = entry
+            if self.changed.get(table, 0) > created and monotonic() - created >= refresh_periods.get(period, 0):
+                self.remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return figure
+
+    def put(self, key, figure, created):
+        # created is taken before the query, so rows committed while rendering still invalidate it
+        size = len(figure)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            self.remove(key)
+            self.entries[key] = (figure, created)
+            self.size += size
+            while self.size > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.size -= len(entry[0])
+
+    def invalidate(self, table):
+        with self.lock:
+            self.changed[table] = monotonic()
+
+
+figure_cache = FigureCache()
+
+
+def invalidate_figures(table, data):
+    figure_cache.invalidate(table)
@@ -0,0 +1,94 @@
+import math
+
+
+# Derived weather metrics over whole series. Every formula is written once and works on floats
+# and NumPy arrays alike: xp is math or numpy module.
+
+kelvin = 273.15
+magnus_b = 17.62  # Magnus dew point approximation over water
+magnus_c = 243.12  # °C
+
+# heat index fits of fahrenheit (f) and relative humidity (h), result is average of three
+#   c1, c2: 1, f, h, f*h, f^2, h^2, f^2*h, f*h^2, f^2*h^2
+#   c3: same terms, then f^3, h^3, f^3*h, f*h^3, f^3*h^2, f^2*h^3, f^3*h^3
+heat_index_c1 = (-42.379, 2.04901523, 10.14333127, -0.22475541, -6.83783e-03, -5.481717e-02, 1.22874e-03,
+                 8.5282e-04, -1.99e-06)
+heat_index_c2 = (0.363445176, 0.988622465, 4.777114035, -0.114037667, -0.000850208, -0.020716198, 0.000687678,
+                 0.000274954, 0)
+heat_index_c3 = (16.923, 0.185212, 5.37941, -0.100254, 0.00941695, 0.00728898, 0.000345372, -0.000814971,
+                 0.0000102102, -0.000038646, 0.0000291583, 0.00000142721, 0.000000197483, -0.0000000218429,
+                 0.000000000843296, -0.0000000000481975)
+# the three fits share terms, so their average is one polynomial
+heat_index_k = tuple((c1 + c2 + c3) / 3.0 for c1, c2, c3 in zip(heat_index_c1 + (0,) * 7, heat_index_c2 + (0,) * 7,
+                                                                 heat_index_c3))
+
+
+def celsius_to_fahrenheit_formula(xp, celsius):
+    return 9.0 / 5.0 * celsius + 32
+
+
+def fahrenheit_to_celsius_formula(xp, fahrenheit):
+    return (fahrenheit - 32) * 5 / 9
+
+
+def mmhg_to_baromin_formula(xp, mmhg):
+    return mmhg / 25.4
+
+
+def heat_index_formula(xp, celsius, hum):
+    # fahrenheit, as expected by WU
+    f = celsius_to_fahrenheit_formula(xp, celsius)
+    f2 = f * f
+    f3 = f2 * f
+    h2 = hum * hum
+    h3 = h2 * hum
+    k = heat_index_k
+    return (k[0] + k[1] * f + k[2] * hum + k[3] * f * hum + k[4] * f2 + k[5] * h2 + k[6] * f2 * hum + k[7] * f * h2 +
+            k[8] * f2 * h2 + k[9] * f3 + k[10] * h3 + k[11] * f3 * hum + k[12] * f * h3 + k[13] * f3 * h2 +
+            k[14] * f2 * h3 + k[15] * f3 * h3)
+
+
+def humidex_formula(xp, celsius, dew_point):
+    # vapor pressure in mbar from dew point
+    e = 6.11 * xp.exp(5417.7530 * ((1 / kelvin) - (1 / (dew_point + kelvin))))
+    return celsius + 0.5555 * (e - 10.0)
+
+
+def dew_point_formula(xp, celsius, hum):
+    gamma = xp.log(hum / 100.0) + magnus_b * celsius / (magnus_c + celsius)
+    return magnus_c * gamma / (magnus_b - gamma)
+
+
+def batch(formula, *series):
+    # same result with and without NumPy: list of floats for sequences, float for plain numbers
+    if all(isinstance(values, (int, float)) for values in series):
+        return float(formula(math, *(float(value) for value in series)))
+    try:
+        import numpy  # imported on first call, so importing this module stays cheap
+    except ImportError:
+        return [formula(math, *values) for values in zip(*([float(value) for value in values] for values in series))]
+    return formula(numpy, *(numpy.asarray(values, dtype=float) for values in series)).tolist()
+
+
+def celsius_to_fahrenheit(celsius):
+    return batch(celsius_to_fahrenheit_formula, celsius)
+
+
+def fahrenheit_to_celsius(fahrenheit):
+    return batch(fahrenheit_to_celsius_formula, fahrenheit)
+
+
+def mmhg_to_baromin(mmhg):
+    return batch(mmhg_to_baromin_formula, mmhg)
+
+
+def heat_index(celsius, humidity):
+    return batch(heat_index_formula, celsius, humidity)
+
+
+def humidex(celsius, dew_point):
+    return batch(humidex_formula, celsius, dew_point)
+
+
+def dew_point(celsius, humidity):
+    return batch(dew_point_formula, celsius, humidity)
@@ -0,0 +1,42 @@
+import json
+from struct import Struct
+
+
+binary_row = Struct('<qd')  # int64 unix timestamp, float64 value, little endian
+binary_chunk = 512  # rows packed per yielded chunk
+
+mimetypes = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv', 'binary': 'application/octet-stream'}
+
+
+def ndjson_lines(rows, param):
+    for unix_ts, value in rows:
+        yield json.dumps({'unix_ts': unix_ts, param: value}) + '\n'
+
+
+def csv_lines(rows, param):
+    yield f'unix_ts,{param}\n'
+    for unix_ts, value in rows:
+        yield f'{unix_ts},{"" if value is None else value}\n'
+
+
+def binary_chunks(rows):
+    buffer = bytearray(binary_row.size * binary_chunk)
+    count = 0
+    for unix_ts, value in rows:
+        binary_row.pack_into(buffer, count * binary_row.size, unix_ts, float('nan') if value is None else value)
+        count += 1
+        if count == binary_chunk:
+            yield bytes(buffer)
+            count = 0
+    if count:
+        yield bytes(buffer[:count * binary_row.size])
+
+
+def export_series(rows, param, output_format):
+    if output_format == 'ndjson':
+        return ndjson_lines(rows, param)
+    if output_format == 'csv':
+        return csv_lines(rows, param)
+    if output_format == 'binary':
+        return binary_chunks(rows)
+    raise ValueError('Wrong format', f'{output_format}')
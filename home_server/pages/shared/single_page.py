@@ -21,7 +21,7 @@ def single_wind_page(param, period):
 
 def single_power_page(param, period):
     offline_fig = generate_scatter(table='power_data', param=param, period=period)
-    return render_template("weather_station/single_power_page.html",
+    return render_template("power_management/single_power_page.html",
                            param=param,
                            period=period,
                            offline_fig=offline_fig)
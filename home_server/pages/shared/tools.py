@@ -1,14 +1,20 @@
 import math
-from os import getcwd
-from time import sleep, time
-
-from plotly import graph_objects, offline
-from picamera import PiCamera
+from functools import lru_cache
+from os import fdopen, path, remove, replace
+from tempfile import mkstemp
+from time import monotonic
 
+from camera_archive import camera_archive
+from camera_service import capture_period, get_frame
 from db.queries import data_update_period, get_last_series_measurement
+from db.writer import add_listener
+from pages.shared.figure_cache import figure_cache, invalidate_figures
+from pages.shared.metrics import heat_index_formula, humidex_formula
 
 
-camera = PiCamera()
+# plotly and numpy are imported on first use, so sensor API is up within a second of boot
+add_listener(invalidate_figures)
+chart_points = 1000  # more points than this are not visible on a chart anyway
 
 units = {'temperature': '°C', 'humidity': '%', 'pressure': 'mm Hg', 'dew_point': '°C',
          'avg_voltage': 'V', 'avg_current': 'A', 'avg_power': 'W', 'avg_consumption': 'W/h',
@@ -54,9 +60,23 @@ def convert_param(param, table):
 
 
 def generate_scatter(table, param, period, height=None, width=None):
+    key = (table, param, period, height, width)
+    offline_fig = figure_cache.get(key)
+    if offline_fig is None:
+        created = monotonic()
+        offline_fig = render_scatter(table=table, param=param, period=period, height=height, width=width)
+        figure_cache.put(key, offline_fig, created)
+    return offline_fig
+
+
+def render_scatter(table, param, period, height=None, width=None):
+    from plotly import graph_objects, offline
+    from pages.shared.downsampling import downsample
+
     fparam, meas_type = convert_param(param, table)
     num_period = convert_period(period)
     x, y = get_last_series_measurement(table=table, period=num_period, param=fparam, meas_type=meas_type)
+    x, y = downsample(x, y, chart_points, envelope=fparam.startswith(('max_', 'min_')))
     line_chart1 = graph_objects.Scatter(x=x, y=y)
     lay1 = graph_objects.Layout(
         title=f'{param}',
@@ -68,11 +88,35 @@ def generate_scatter(table, param, period, height=None, width=None):
     offline_fig = offline.plot(fig1,
                                config={"displayModeBar": False},
                                show_link=False,
-                               include_plotlyjs=True,
+                               include_plotlyjs=False,
                                output_type='div')
     return offline_fig
 
 
+def ensure_plotly_js(static_folder):
+    # charts only ship figure JSON, plotly.js itself is served once from static
+    from plotly import offline
+
+    plotly_js = f'plotly-{offline.get_plotlyjs_version()}.min.js'  # versioned name, so it may be cached forever
+    js_file = path.join(static_folder, plotly_js)
+    if not path.exists(js_file):
+        # written aside and renamed, so browser never gets half written file
+        fd, tmp_file = mkstemp(dir=static_folder, suffix='.tmp')
+        try:
+            with fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(offline.get_plotlyjs())
+            replace(tmp_file, js_file)
+        except Exception:
+            remove(tmp_file)
+            raise
+    return plotly_js
+
+
+@lru_cache()
+def get_plotly_js(static_folder):
+    return ensure_plotly_js(static_folder)
+
+
 def celsius_to_fahrenheit(celsius):
     farenheit = 9.0 / 5.0 * float(celsius) + 32
     return farenheit
@@ -98,56 +142,15 @@ def deg_to_heading(degrees=0):
 
 
 def heat_index(temp, hum):
-    fahrenheit = celsius_to_fahrenheit(temp)
-    # Creating multiples of 'fahrenheit' & 'hum' values for the coefficients
-    t2 = pow(fahrenheit, 2)
-    t3 = pow(fahrenheit, 3)
-    h2 = pow(hum, 2)
-    h3 = pow(hum, 3)
-
-    # Coefficients for the calculations
-    c1 = [-42.379, 2.04901523, 10.14333127, -0.22475541, -6.83783e-03, -5.481717e-02, 1.22874e-03, 8.5282e-04,
-          -1.99e-06]
-    c2 = [0.363445176, 0.988622465, 4.777114035, -0.114037667, -0.000850208, -0.020716198, 0.000687678, 0.000274954, 0]
-    c3 = [16.923, 0.185212, 5.37941, -0.100254, 0.00941695, 0.00728898, 0.000345372, -0.000814971, 0.0000102102,
-          -0.000038646, 0.0000291583, 0.00000142721, 0.000000197483, -0.0000000218429, 0.000000000843296,
-          -0.0000000000481975]
-
-    # Calculating heat-indexes with 3 different formula
-    heatindex1 = c1[0] + (c1[1] * fahrenheit) + (c1[2] * hum) + (c1[3] * fahrenheit * hum) + (c1[4] * t2) + (
-                c1[5] * h2) + (c1[6] * t2 * hum) + (c1[7] * fahrenheit * h2) + (c1[8] * t2 * h2)
-    heatindex2 = c2[0] + (c2[1] * fahrenheit) + (c2[2] * hum) + (c2[3] * fahrenheit * hum) + (c2[4] * t2) + (
-                c2[5] * h2) + (c2[6] * t2 * hum) + (c2[7] * fahrenheit * h2) + (c2[8] * t2 * h2)
-    heatindex3 = c3[0] + (c3[1] * fahrenheit) + (c3[2] * hum) + (c3[3] * fahrenheit * hum) + (c3[4] * t2) + (
-                c3[5] * h2) + (c3[6] * t2 * hum) + (c3[7] * fahrenheit * h2) + (c3[8] * t2 * h2) + (c3[9] * t3) + (
-                             c3[10] * h3) + (c3[11] * t3 * hum) + (c3[12] * fahrenheit * h3) + (c3[13] * t3 * h2) + (
-                             c3[14] * t2 * h3) + (c3[15] * t3 * h3)
-
-    avg_heat_index = (heatindex1 + heatindex2 + heatindex3)/3.0
-    return avg_heat_index
+    # fahrenheit, same formula as batched pages.shared.metrics.heat_index
+    return heat_index_formula(math, float(temp), float(hum))
 
 
 def humidex(t, d):
-    kelvin = 273.15
-    temperature = t + kelvin
-    dewpoint = d + kelvin
-
-    # Calculate vapor pressure in mbar.
-    e = 6.11 * math.exp(5417.7530 * ((1 / kelvin) - (1 / dewpoint)))
-
-    # Calculate saturation vapor pressure
-    h = 0.5555 * (e - 10.0)
-
-    hum_idex = temperature + h - kelvin
-
-    return hum_idex
+    return humidex_formula(math, float(t), float(d))
 
 
 def take_photo():
-    camera.resolution = (1280, 720)  # lower resolution to fit in 1mb limitation
-    camera.start_preview()
-    sleep(5)
-    image = f'{getcwd()}/camera/image_{int(time())}.jpg'
-    camera.capture(image)
-    camera.stop_preview()
-    return image
+    # latest scheduled frame is fresh enough, camera is never opened in request
+    frame = get_frame(max_age=capture_period)
+    return camera_archive.store(frame, force=True)
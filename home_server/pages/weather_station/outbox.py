@@ -0,0 +1,104 @@
+from itertools import groupby
+from threading import Event, Thread
+from time import time
+
+from db.db import SharedConnection
+from db.queries import get_measurement_at
+
+
+drain_period = 60  # seconds between outbox scans
+batch_limit = 12  # uploads per service per scan, so recovery after an outage is bounded
+send_interval = 1  # seconds between two uploads to the same provider
+retry_delay = 60  # seconds, doubled after every failed attempt
+max_retry_delay = 60 * 60
+max_age = 60 * 60 * 24 * 7  # pending uploads older than this are dropped
+live_period = 600  # seconds, readings older than this can be sent only with a timestamp
+
+
+class Outbox(SharedConnection):
+    def __init__(self):
+        super().__init__()
+        self.stopped = Event()
+        self.deliver = None
+        self.backfill_services = ()
+        self.thread = None
+        self.running = set()  # entries of live uploads still in progress, drain leaves them alone
+
+    def add(self, service, unix_ts, meas_type):
+        # entry is taken by the live upload until release(), restart frees it for drain
+        with self.lock:
+            connection = self.get_connection()
+            cur = connection.execute('INSERT INTO outbox(service,unix_ts,meas_type,next_attempt) VALUES(?,?,?,?);',
+                                     (service, int(unix_ts), int(meas_type), int(time())))
+            connection.commit()
+            self.running.add(cur.lastrowid)
+            return cur.lastrowid
+
+    def release(self, entry_id):
+        with self.lock:
+            self.running.discard(entry_id)
+
+    def remove(self, entry_id):
+        self.execute('DELETE FROM outbox WHERE id = ?;', (entry_id,))
+
+    def reschedule(self, entry):
+        delay = min(retry_delay * 2 ** entry['attempts'], max_retry_delay)
+        self.execute('UPDATE outbox SET attempts = attempts + 1, next_attempt = ? WHERE id = ?;',
+                     (int(time() + delay), entry['id']))
+
+    def start(self, deliver, backfill_services):
+        # deliver(service, data, backfill) uploads one reading and raises on failure
+        self.deliver = deliver
+        self.backfill_services = backfill_services
+        if self.thread is None:
+            self.thread = Thread(target=self.run, name='outbox', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        while not self.stopped.wait(drain_period):
+            try:
+                self.drain()
+            except Exception as error:
+                print(f'Outbox drain failed: {error}')  # debug
+
+    def drain(self):
+        now = time()
+        self.execute('DELETE FROM outbox WHERE unix_ts < ?;', (int(now - max_age),))
+        _, rows = self.execute('''SELECT * FROM outbox WHERE next_attempt <= ?
+                                  ORDER BY service, unix_ts;''', (int(now),))
+        with self.lock:
+            rows = [row for row in rows if row['id'] not in self.running]
+        for service, entries in groupby(rows, key=lambda row: row['service']):
+            entries = list(entries)
+            if service not in self.backfill_services:
+                # provider takes live data only, just the newest fresh reading is worth sending
+                expired = entries[:-1]
+                entries = entries[-1:]
+                if now - entries[0]['unix_ts'] > live_period:
+                    expired += entries
+                    entries = []
+                for entry in expired:
+                    self.remove(entry['id'])
+            for entry in entries[:batch_limit]:
+                if self.stopped.is_set():
+                    return
+                with self.lock:
+                    data = get_measurement_at('weather_data', entry['unix_ts'], entry['meas_type'],
+                                              connection=self.get_connection())
+                if not data:
+                    self.remove(entry['id'])
+                    continue
+                try:
+                    self.deliver(service, data, backfill=time() - entry['unix_ts'] > live_period)
+                except Exception as error:
+                    print(f'Outbox upload to {service} failed: {error}')  # debug
+                    self.reschedule(entry)
+                    break  # provider is still down, don't hammer it
+                self.remove(entry['id'])
+                self.stopped.wait(send_interval)
+
+
+outbox = Outbox()
@@ -0,0 +1,84 @@
+from threading import Event, Lock, Thread
+from time import time
+
+from clients import get_client
+from pages.shared.tools import deg_to_heading
+from secure_data import wu_api_key, wu_reference_station_ids
+
+
+refresh_period = 300  # seconds between WU requests, keeps API quota usage flat
+reference_ttl = 60 * 60  # older observations are still shown, but marked as expired
+
+empty_reference = {'wu_temp': '?', 'wu_humidity': '?', 'wu_pressure': '?', 'wu_dew_point': '?',
+                   'wu_wind_speed': '?', 'wu_wind_gust': '?', 'wu_wind_direction': '?', 'wu_wind_heading': '?'}
+
+reference = {'values': empty_reference, 'station_id': None, 'updated': None}
+reference_lock = Lock()
+reference_thread = None
+stopped = Event()
+
+
+def make_wu():
+    from wunderground_pws import WUndergroundAPI, units
+
+    return WUndergroundAPI(api_key=wu_api_key, units=units.METRIC_SI_UNITS)
+
+
+def get_wu():
+    return get_client('wu', make_wu)
+
+
+def parse_observation(wu_current):
+    observation = wu_current['observations'][0]
+    return {'wu_temp': observation['metric_si']['temp'],
+            'wu_humidity': observation['humidity'],
+            'wu_pressure': int(int(observation['metric_si']['pressure']) / 1.33),
+            'wu_dew_point': observation['metric_si']['dewpt'],
+            'wu_wind_speed': observation['metric_si']['windSpeed'],
+            'wu_wind_gust': observation['metric_si']['windGust'],
+            'wu_wind_direction': observation['winddir'],
+            'wu_wind_heading': deg_to_heading(int(observation['winddir']))}
+
+
+def refresh_reference():
+    # first station which answers wins, the rest are fallbacks
+    for station_id in wu_reference_station_ids:
+        try:
+            values = parse_observation(get_wu().current(station_id=station_id))
+        except Exception as error:
+            print(f'WU reference {station_id} failed: {error}')  # debug
+            continue
+        with reference_lock:
+            reference.update(values=values, station_id=station_id, updated=time())
+        return True
+    return False
+
+
+def get_reference():
+    with reference_lock:
+        values = dict(reference['values'])
+        station_id = reference['station_id']
+        updated = reference['updated']
+    age = time() - updated if updated else None
+    values['wu_station_id'] = station_id or '?'
+    values['wu_age'] = f'{int(age // 60)} min' if age is not None else '?'
+    values['wu_expired'] = age is None or age > reference_ttl
+    return values
+
+
+def run_reference():
+    while True:
+        refresh_reference()
+        if stopped.wait(refresh_period):
+            break
+
+
+def start_reference():
+    global reference_thread
+    if reference_thread is None:
+        reference_thread = Thread(target=run_reference, name='wu-reference', daemon=True)
+        reference_thread.start()
+
+
+def stop_reference():
+    stopped.set()
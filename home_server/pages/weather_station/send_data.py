@@ -1,43 +1,96 @@
-from ftplib import FTP
-from shutil import copyfile
-from os import getcwd
 from datetime import datetime
+from ftplib import FTP
+from functools import partial
+from io import BytesIO
+from urllib.parse import quote_plus
 
-import requests
-from openweather_pws import Station
-from narodmon import Narodmon
+from flask import jsonify
 
-from db.queries import get_last_measurement_pack
+from camera_service import capture_period, get_frame, get_variant
+from clients import get_client, get_session
+from db.queries import get_latest_measurement, get_measurement_age
 from secure_data import wu_station_id, wu_station_pwd, wu_cam_id, wu_cam_pwd
 from secure_data import pwsw_station_id, pwsw_api_key, ow_station_id, ow_api_key
 from secure_data import narodmon_mac, narodmon_owner, narodmon_name, latitude, latitude, longitude, altitude
 from pages.shared.tools import celsius_to_fahrenheit, fahrenheit_to_celsius, mmhg_to_baromin, heat_index, humidex
-from pages.shared.tools import take_photo, baromin_to_mmhg
+from pages.shared.tools import baromin_to_mmhg
+from pages.weather_station.outbox import outbox
+from pages.weather_station.uploader import submit_job, get_job, upload_timeout
+
 
+stale_period = 600  # seconds
+upload_services = ('wu', 'pwsw', 'ow', 'narodmon')
+backfill_services = ('wu', 'pwsw')  # take dateutc, so missed readings may be sent later
 
-def is_data_stale(timestamp):
-    delta = datetime.now() - timestamp
-    return_val = True if delta.seconds < 600 else False
+
+def is_data_stale(table='weather_data', meas_type=1):
+    age = get_measurement_age(table, meas_type)
+    return_val = True if age is not None and age < stale_period else False
     return return_val
 
 
 # Send data to services
 
 def send_data():
-    data = get_last_measurement_pack('0', '1')
-    image = take_photo()
-    response = 'ERROR: DATA OUTDATED'
-    if is_data_stale(timestamp=data['ts']):
-        wu_data = prepare_wu_format(data=data)
-        response = str(send_data_to_wu(wu_data))
-        response += str(send_data_to_pwsw(wu_data))
-        response += str(send_data_to_ow(data))
-        response += str(send_data_to_nardmon(data))
-    send_image_to_wu(image)
-    copyfile(image, f'{getcwd()}/camera/image.jpg')
+    # services are uploaded in background, status is available by job id
+    data = get_latest_measurement('weather_data', 1)
+    tasks = {'wu_camera': send_photo}
+    entry_ids = {}
+    response = {}
+    if is_data_stale('weather_data', 1):
+        for service in upload_services:
+            # recorded before sending, so the reading survives failed upload or restart
+            entry_ids[service] = outbox.add(service, data['unix_ts'], 1)
+            tasks[service] = partial(deliver_pending, entry_ids[service], service, data)
+    else:
+        response['error'] = 'DATA OUTDATED'
+    # outbox retries the entry only after the live upload gave up
+    response['job_id'] = submit_job(tasks, finished=lambda service: outbox.release(entry_ids.get(service)))
+    return jsonify(response), 202
+
+
+def send_data_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'NOT FOUND'}), 404
+    return jsonify(job)
+
+
+def deliver(service, data, backfill=False):
+    if service in ('wu', 'pwsw'):
+        timestamp = None
+        if backfill:
+            timestamp = quote_plus(datetime.utcfromtimestamp(data['unix_ts']).strftime('%Y-%m-%d %H:%M:%S'))
+        wu_data = prepare_wu_format(data=data, timestamp=timestamp)
+        if service == 'wu':
+            return send_data_to_wu(wu_data)
+        return send_data_to_pwsw(wu_data)
+    if service == 'ow':
+        return send_data_to_ow(data)
+    if service == 'narodmon':
+        return send_data_to_nardmon(data)
+    raise ValueError('Wrong service', f'{service}')
+
+
+def deliver_pending(entry_id, service, data):
+    response = deliver(service, data)
+    outbox.remove(entry_id)
     return response
 
 
+def start_outbox():
+    outbox.start(deliver, backfill_services)
+
+
+def stop_outbox():
+    outbox.stop()
+
+
+def send_photo():
+    frame = get_frame(max_age=capture_period)
+    return send_image_to_wu(get_variant(frame, 'upload'))
+
+
 def prepare_wu_format(data, timestamp=None):
     payload = f"&dateutc={timestamp}" if timestamp else "&dateutc=now"
     payload += "&action=updateraw"
@@ -45,61 +98,83 @@ def prepare_wu_format(data, timestamp=None):
     payload += "&tempf=" + str(celsius_to_fahrenheit(data['temperature']))
     payload += "&baromin=" + str(mmhg_to_baromin(data['pressure']))
     payload += "&dewptf=" + str(celsius_to_fahrenheit(data['dew_point']))
-    payload += "&heatindex=" + str(celsius_to_fahrenheit(heat_index(temp=data['temperature'], hum=data['humidity'])))
+    payload += "&heatindex=" + str(heat_index(temp=data['temperature'], hum=data['humidity']))  # already fahrenheit
     payload += "&humidex=" + str(celsius_to_fahrenheit(humidex(t=data['temperature'], d=data['dew_point'])))
     payload += "&precip=" + str(data['precip'])
-    payload += "&uv" + str(data['uv'])
+    payload += "&uv=" + str(data['uv'])
     return payload
 
 
 def send_data_to_wu(data):
     wu_url = "https://weatherstation.wunderground.com/weatherstation/updateweatherstation.php?"
     wu_creds = "ID=" + wu_station_id + "&PASSWORD=" + wu_station_pwd
-    response = requests.get(f'{wu_url}{wu_creds}{data}')
+    response = get_session().get(f'{wu_url}{wu_creds}{data}')
+    response.raise_for_status()
     return response.content
 
 
 def send_image_to_wu(image):
-    session = FTP('webcam.wunderground.com', wu_cam_id, wu_cam_pwd)
-    file = open(image, 'rb')
-    session.storbinary('image.jpg', file)
-    file.close()
+    # image is JPEG bytes, BytesIO shares the buffer, nothing is copied or written to disk
+    session = FTP('webcam.wunderground.com', wu_cam_id, wu_cam_pwd, timeout=upload_timeout)
+    response = session.storbinary('STOR image.jpg', BytesIO(image))
     session.quit()
+    return response
 
 
 def send_data_to_pwsw(data):
     pwsw_url = "http://www.pwsweather.com/pwsupdate/pwsupdate.php?"
     pwsw_creds = "ID=" + pwsw_station_id + "&PASSWORD=" + pwsw_api_key
-    response = requests.get(f'{pwsw_url}{pwsw_creds}{data}')
+    response = get_session().get(f'{pwsw_url}{pwsw_creds}{data}')
+    response.raise_for_status()
     return response.content
 
 
+def make_ow_station():
+    from openweather_pws import Station
+
+    return Station(api_key=ow_api_key, station_id=ow_station_id)
+
+
+def make_narodmon():
+    from narodmon import Narodmon
+
+    return Narodmon(mac=narodmon_mac, name=narodmon_name, owner=narodmon_owner, lat=latitude, lon=longitude,
+                    alt=altitude)
+
+
 def send_data_to_ow(data):
-    pws = Station(api_key=ow_api_key, station_id=ow_station_id)
-    response = pws.measurements.set(temperature=data['temperature'], humidity=data['humidity'],
-                                    dew_point=data['dew_point'], pressure=data['pressure'],
-                                    heat_index=fahrenheit_to_celsius(heat_index(temp=data['temperature'],
-                                                                                hum=data['humidity'])),
-                                    humidex=humidex(t=data['temperature'], d=data['dew_point']))
-    return response
+    # library posts without timeout, so its endpoint is called through the shared session
+    measurements = get_client('ow', make_ow_station).measurements
+    payload = {'station_id': measurements.station_id, 'dt': data['unix_ts'],
+               'temperature': data['temperature'], 'humidity': data['humidity'],
+               'dew_point': data['dew_point'], 'pressure': data['pressure'],
+               'heat_index': fahrenheit_to_celsius(heat_index(temp=data['temperature'], hum=data['humidity'])),
+               'humidex': humidex(t=data['temperature'], d=data['dew_point'])}
+    response = get_session().post(f'{measurements.endpoint}?appid={measurements.api_key}', json=[payload])
+    response.raise_for_status()
+    return response.content
 
 
 def send_data_to_nardmon(data):
-    nm = Narodmon(mac=narodmon_mac, name=narodmon_name, owner=narodmon_owner,
-                  lat=latitude, lon=longitude, alt=altitude)
-    temperature = nm.via_json.prepare_sensor_data(id_in="TEMPC", value=data['temperature'])
-    pressure = nm.via_json.prepare_sensor_data(id_in="MMHG", value=(data['pressure']))
-    humidity = nm.via_json.prepare_sensor_data(id_in="HUM", value=data['humidity'])
-    dew_point = nm.via_json.prepare_sensor_data(id_in="DEW", value=data['dew_point'])
+    from narodmon.tools import status_decode
+
+    nm = get_client('narodmon', make_narodmon).via_json
+    temperature = nm.prepare_sensor_data(id_in="TEMPC", value=data['temperature'])
+    pressure = nm.prepare_sensor_data(id_in="MMHG", value=(data['pressure']))
+    humidity = nm.prepare_sensor_data(id_in="HUM", value=data['humidity'])
+    dew_point = nm.prepare_sensor_data(id_in="DEW", value=data['dew_point'])
     sensors = [temperature, pressure, humidity, dew_point]
-    response = nm.via_json.send_short_data(sensors=sensors)
-    return response
+    # same payload as send_short_data(), but sent through the shared session, library has no timeout
+    payload = {"devices": [nm.prepare_device_data_short(sensors)]}
+    response = get_session().post(nm.endpoint, json=payload, headers=nm.headers)
+    status_decode(response)
+    return response.json()
 
 
 def send_data_to_informer():
-    data_in = get_last_measurement_pack('weather_data', '0', '0')
+    data_in = get_latest_measurement('weather_data', 0)
 
-    if is_data_stale(timestamp=data_in['ts']):
+    if is_data_stale('weather_data', 0):
         formatted_string = f"IN: T={data_in['temperature']}*C, " \
                            f"H={data_in['humidity']}% | "
         pressure = int(data_in['pressure'])
@@ -107,8 +182,8 @@ def send_data_to_informer():
         formatted_string = "IN data outdated!"
         pressure = None
 
-    data_out = get_last_measurement_pack('weather_data', '0', '1')
-    if is_data_stale(timestamp=data_out['ts']):
+    data_out = get_latest_measurement('weather_data', 1)
+    if is_data_stale('weather_data', 1):
         formatted_string = f"{formatted_string}" \
                            f"OUT: T={data_out['temperature']}*C, " \
                            f"H={data_out['humidity']}%, " \
@@ -0,0 +1,78 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from threading import Lock
+from time import monotonic, sleep, time
+from uuid import uuid4
+
+from clients import http_timeout
+
+
+upload_timeout = http_timeout  # seconds per attempt, HTTP session uses it by default, FTP takes it explicitly
+upload_retries = 3
+retry_backoff = 2  # seconds before the second attempt, doubled after every failure
+# job stops waiting for a service after this, every attempt is bounded by upload_timeout anyway
+service_timeout = upload_retries * upload_timeout + retry_backoff * (2 ** upload_retries)
+jobs_kept = 20
+
+workers = ThreadPoolExecutor(max_workers=6, thread_name_prefix='upload')
+dispatchers = ThreadPoolExecutor(max_workers=2, thread_name_prefix='upload-job')
+jobs = OrderedDict()
+jobs_lock = Lock()
+
+
+def run_with_retries(task):
+    delay = retry_backoff
+    for attempt in range(1, upload_retries + 1):
+        try:
+            response = task()
+            return {'status': 'ok', 'attempts': attempt, 'response': str(response)}
+        except Exception as error:
+            if attempt == upload_retries:
+                return {'status': 'error', 'attempts': attempt, 'response': str(error)}
+            sleep(delay)
+            delay *= 2
+
+
+def run_task(name, task, finished):
+    try:
+        return run_with_retries(task)
+    finally:
+        if finished is not None:
+            finished(name)
+
+
+def run_job(job, tasks, finished):
+    started = monotonic()
+    futures = {name: workers.submit(run_task, name, task, finished) for name, task in tasks.items()}
+    for name, future in futures.items():
+        try:
+            result = future.result(timeout=max(started + service_timeout - monotonic(), 0))
+        except TimeoutError:
+            result = {'status': 'timeout', 'attempts': None, 'response': None}
+        with jobs_lock:
+            job['services'][name] = result
+    with jobs_lock:
+        job['status'] = 'done'
+        job['finished'] = time()
+
+
+def submit_job(tasks, finished=None):
+    # tasks is {service name: callable without args}, every service runs on its own worker
+    # finished(name) is called when the last attempt of the task is over, even after the job timed out
+    job_id = uuid4().hex
+    job = {'status': 'running', 'started': time(), 'finished': None,
+           'services': {name: {'status': 'pending'} for name in tasks}}
+    with jobs_lock:
+        jobs[job_id] = job
+        while len(jobs) > jobs_kept:
+            jobs.popitem(last=False)
+    dispatchers.submit(run_job, job, tasks, finished)
+    return job_id
+
+
+def get_job(job_id):
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return None
+        return dict(job, services={name: dict(result) for name, result in job['services'].items()})
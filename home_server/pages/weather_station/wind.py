@@ -1,10 +1,10 @@
 from flask import render_template
 
-from db.queries import get_last_measurement_pack
+from db.queries import get_latest_measurement
 
 
 def wind_page():
-    wind_data = get_last_measurement_pack('wind_data', '0')
+    wind_data = get_latest_measurement('wind_data')
 
     return render_template("weather_station/wind_dashboard.html",
                            avg_rps=wind_data['avg_rps'],
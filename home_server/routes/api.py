@@ -1,11 +1,15 @@
-from datetime import datetime
 from time import time
 
-from flask import jsonify, request, abort
+from flask import jsonify, request, abort, Response, send_file, stream_with_context
 
-from db.queries import store_weather_data
-from pages.weather_station.send_data import send_data, send_data_to_informer
-from pages.shared.tools import take_photo
+from app import app
+from camera_archive import camera_archive
+from camera_service import capture_period, get_frame, get_variant, variant_makers
+from db.queries import check_param, iter_series_measurement, pick_resolution, resolutions
+from ingest import ingest, ingest_many
+from pages.weather_station.send_data import send_data, send_data_status, send_data_to_informer
+from pages.shared.series_export import export_series, mimetypes
+from pages.shared.tools import take_photo, convert_param
 
 
 @app.route('/api/v1/send_data')
@@ -13,47 +17,123 @@ def send_weather_data():
     return send_data()
 
 
+@app.route('/api/v1/send_data/<job_id>')
+def send_weather_data_status(job_id):
+    return send_data_status(job_id)
+
+
+def ingest_request_data(table, data):
+    try:
+        return ingest(table, data)
+    except ValueError:
+        abort(400)
+
+
 @app.route('/api/v1/add_weather_data', methods=['POST'])
-def store_weather_data():
+def add_weather_data():
     if not request.json:
         abort(400)
-    timestamp = str(datetime.now())
-    unix_timestamp = int(time())
-    data = request.json.get('data', "")
-    db_data = f'"{timestamp}", {unix_timestamp}, {data}'
-    store_weather_data(db_data)
-    return jsonify({'data': db_data}), 201
+    row = ingest_request_data('weather_data', request.json.get('data', ""))
+    return jsonify({'data': row}), 201
+
+
+@app.route('/api/v1/add_weather_data_batch', methods=['POST'])
+def add_weather_data_batch():
+    readings = request.json.get('readings') if request.json else None
+    if not isinstance(readings, list):
+        abort(400)
+    try:
+        results = ingest_many('weather_data', readings)
+    except ValueError:
+        abort(413)
+    # 201 means node may drop its buffer, rejected readings won't get better on retry;
+    # 503 means readings were not stored, resending the whole batch is safe, stored ones are ignored
+    status = 503 if any(result['status'] == 503 for result in results) else 201
+    return jsonify({'accepted': sum(result['status'] == 201 for result in results), 'results': results}), status
 
 
 @app.route('/api/v1/add_power_data', methods=['POST'])
-def store_power_data():
+def add_power_data():
     if not request.json:
         abort(400)
-    timestamp = str(datetime.now())
-    unix_timestamp = int(time())
-    data = request.json.get('data', "")[2:]
-    db_data = f'"{timestamp}", {unix_timestamp}, {data}'
-    store_power_data(db_data)
-    return jsonify({'data': db_data}), 201
+    row = ingest_request_data('power_data', request.json.get('data', "")[2:])
+    return jsonify({'data': row}), 201
 
 
 @app.route('/api/v1/add_wind_data', methods=['POST'])
-def store_wind_data():
+def add_wind_data():
     if not request.json:
         abort(400)
-    timestamp = str(datetime.now())
-    unix_timestamp = int(time())
-    data = request.json.get('data', "")[2:]
-    db_data = f'"{timestamp}", {unix_timestamp}, {data}'
-    store_wind_data(db_data)
-    return jsonify({'data': db_data}), 201
+    row = ingest_request_data('wind_data', request.json.get('data', "")[2:])
+    return jsonify({'data': row}), 201
+
+
+@app.route('/api/v1/lora_stats', methods=['GET'])
+def get_lora_stats():
+    from lora_receiver import get_stats  # radio driver is loaded only by the serving process
+
+    stats = get_stats()
+    if stats is None:
+        return jsonify({'error': 'RECEIVER NOT RUNNING'}), 503
+    return jsonify(stats)
 
 
 @app.route('/api/v1/get_weather_data', methods=['GET'])
-def store_wind_data():
+def get_weather_data():
     return send_data_to_informer()
 
 
+@app.route('/api/v1/series', methods=['GET'])
+def get_series():
+    table = request.args.get('table', 'weather_data')
+    param = request.args.get('param')
+    resolution = request.args.get('resolution', 'raw')
+    output_format = request.args.get('format', 'ndjson')
+    if not param or output_format not in mimetypes:
+        abort(400)
+    try:
+        end = int(request.args.get('to', time()))
+        start = int(request.args.get('from', end - 60 * 60 * 24))
+        fparam, meas_type = convert_param(param, table)
+        check_param(table, fparam)
+    except ValueError:
+        abort(400)
+    if resolution == 'auto':
+        resolution = pick_resolution((end - start) / 60)
+    elif resolution == 'raw':
+        resolution = None
+    elif resolution not in resolutions:
+        abort(400)
+    rows = iter_series_measurement(table, fparam, start, end, resolution, meas_type)
+    return Response(stream_with_context(export_series(rows, param, output_format)), mimetype=mimetypes[output_format])
+
+
 @app.route('/api/v1/capture_photo', methods=['GET'])
 def capture_photo():
-    return take_photo
+    try:
+        return take_photo()
+    except RuntimeError:
+        abort(503)
+
+
+@app.route('/camera/<variant>.jpg', methods=['GET'])
+def camera_image(variant):
+    # served from memory: image (as captured), upload (fits WU limit) or thumbnail
+    if variant not in variant_makers:
+        abort(404)
+    try:
+        frame = get_frame(max_age=capture_period)
+    except RuntimeError:
+        abort(503)
+    response = Response(get_variant(frame, variant), mimetype='image/jpeg')
+    response.last_modified = frame['time']
+    response.cache_control.max_age = capture_period
+    return response.make_conditional(request)
+
+
+@app.route('/camera/at/<int:unix_ts>.jpg', methods=['GET'])
+def camera_image_at(unix_ts):
+    image = camera_archive.get_image_at(unix_ts)
+    if image is None:
+        abort(404)
+    return send_file(image['path'], mimetype='image/jpeg')
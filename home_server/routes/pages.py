@@ -1,7 +1,8 @@
+from app import app
 from pages.index import index_page
 from pages.weather_station.dashboard import dashboard_page
-from page.weather_station.wind import wind_page
-from page.power_management.power import power_page
+from pages.weather_station.wind import wind_page
+from pages.power_management.power import power_page
 
 
 @app.route('/')
@@ -1,5 +1,6 @@
 from flask import request
 
+from app import app
 from pages.shared.single_page import single_weather_page, single_wind_page, single_power_page
 from pages.shared.single_data_page import single_data_page
 from pages.weather_station.compare_page import compare_page
@@ -16,14 +17,14 @@ def single_weather_page_via_url():
 def single_wind_page_via_url():
     period = request.args.get('period')
     param = request.args.get('param')
-    return single_weather_page(param=param, period=period)
+    return single_wind_page(param=param, period=period)
 
 
 @app.route('/single_power_page')
 def single_power_page_via_url():
     period = request.args.get('period')
     param = request.args.get('param')
-    return single_weather_page(param=param, period=period)
+    return single_power_page(param=param, period=period)
 
 
 @app.route('/single_weather_page', methods=['POST'])
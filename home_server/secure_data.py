@@ -9,6 +9,7 @@ wu_api_key =
 wu_station_id =
 wu_station_pwd =
 wu_reference_station_id =
+wu_reference_station_ids = [wu_reference_station_id]  # fallback stations may be added
 wu_cam_id =
 wu_cam_pwd =
 
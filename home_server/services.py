@@ -0,0 +1,43 @@
+from threading import Lock, Thread
+
+from camera_service import start_camera, stop_camera
+from db.queries import warm_latest
+from db.retention import start_retention, stop_retention
+from db.writer import get_writer, stop_writer
+from lora_receiver import run_lora, stop_lora
+from pages.weather_station.reference import start_reference, stop_reference
+from pages.weather_station.send_data import start_outbox, stop_outbox
+
+
+# background services live in the serving process only, request threads share them
+services_lock = Lock()
+services_started = False
+
+
+def start_services():
+    global services_started
+    with services_lock:
+        if services_started:
+            return
+        services_started = True
+        get_writer()
+        warm_latest()
+        Thread(target=run_lora, name='lora', daemon=True).start()
+        start_outbox()
+        start_reference()
+        start_camera()
+        start_retention()
+
+
+def stop_services():
+    global services_started
+    with services_lock:
+        if not services_started:
+            return
+        services_started = False
+        stop_lora()
+        stop_reference()
+        stop_outbox()
+        stop_camera()
+        stop_retention()
+        stop_writer()  # commits whatever is still queued
@@ -0,0 +1,50 @@
+import math
+import random
+import sys
+from datetime import datetime, timedelta
+from os import path
+from time import perf_counter
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), 'home_server'))
+
+from pages.shared import tools
+
+
+# Notes:
+# Benchmark of chart downsampling: payload size and render latency of a chart div with and without it.
+# Run from repo root: python tests/benchmark_downsampling.py [points ...]
+# Series are synthetic 5 minute samples, default sizes are raw week, month and year. Best of 3 renders.
+
+
+def make_series(count):
+    start = datetime(2020, 1, 1)
+    x = [start + timedelta(minutes=5 * i) for i in range(count)]
+    y = [round(10 * math.sin(i / 288 * 2 * math.pi) + random.gauss(0, 1), 2) for i in range(count)]
+    return x, y
+
+
+def measure(series, points):
+    tools.get_last_series_measurement = lambda **kwargs: series
+    tools.chart_points = points
+    best = None
+    for _ in range(3):
+        started = perf_counter()
+        div = tools.render_scatter(table='weather_data', param='temperature_out', period='year')
+        elapsed = perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(div.encode('utf-8')), best * 1000
+
+
+def main(counts):
+    chart_points = tools.chart_points
+    measure(make_series(10), 10)  # plotly import is not measured
+    print(f'{"points":>8}{"kB raw":>10}{"kB down":>10}{"ms raw":>10}{"ms down":>10}')
+    for count in counts:
+        series = make_series(count)
+        raw_size, raw_ms = measure(series, count + 1)  # threshold above series length keeps every point
+        size, ms = measure(series, chart_points)
+        print(f'{count:>8}{raw_size / 1000:>10.1f}{size / 1000:>10.1f}{raw_ms:>10.1f}{ms:>10.1f}')
+
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or [2016, 8640, 105120])
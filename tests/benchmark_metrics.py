@@ -0,0 +1,58 @@
+import builtins
+import random
+import sys
+from os import path
+from timeit import timeit
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), 'home_server'))
+
+import legacy_metrics
+from pages.shared import metrics
+
+
+# Notes:
+# Micro-benchmark of batched metrics against the old scalar code (legacy_metrics), both with and without NumPy.
+# Run from repo root: python tests/benchmark_metrics.py [readings]
+# Prints best of 5 runs in ms for every metric.
+
+
+def without_numpy(function):
+    real_import = builtins.__import__
+
+    def no_numpy(name, *args, **kwargs):
+        if name == 'numpy':
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    def run():
+        builtins.__import__ = no_numpy
+        try:
+            return function()
+        finally:
+            builtins.__import__ = real_import
+    return run
+
+
+def best_ms(function, repeat=5):
+    return min(timeit(function, number=1) for _ in range(repeat)) * 1000
+
+
+def main(count):
+    celsius = [random.uniform(-30, 45) for _ in range(count)]
+    humidity = [random.uniform(5, 100) for _ in range(count)]
+    dew_points = [random.uniform(-35, 30) for _ in range(count)]
+    cases = {'heat_index': (legacy_metrics.heat_index, metrics.heat_index, (celsius, humidity)),
+             'humidex': (legacy_metrics.humidex, metrics.humidex, (celsius, dew_points)),
+             'celsius_to_fahrenheit': (legacy_metrics.celsius_to_fahrenheit, metrics.celsius_to_fahrenheit,
+                                       (celsius,))}
+    print(f'{count} readings, best of 5, ms')
+    print(f'{"metric":<24}{"scalar":>10}{"python":>10}{"numpy":>10}')
+    for name, (scalar, batched, series) in cases.items():
+        old = best_ms(lambda: [scalar(*values) for values in zip(*series)])
+        python = best_ms(without_numpy(lambda: batched(*series)))
+        numpy = best_ms(lambda: batched(*series))
+        print(f'{name:<24}{old:>10.1f}{python:>10.1f}{numpy:>10.1f}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,6 @@
+import sys
+from os import path
+
+
+# modules import each other relative to home_server, as when the server is started from there
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), 'home_server'))
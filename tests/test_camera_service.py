@@ -0,0 +1,58 @@
+import sys
+
+import pytest
+
+import camera_service
+from camera_service import CameraService, FakeCamera, get_variant, make_camera
+
+
+@pytest.fixture(autouse=True)
+def listeners(monkeypatch):
+    # camera archive registers itself once imported by other tests, frames must not land in the working tree
+    monkeypatch.setattr(camera_service, 'listeners', [])
+
+
+@pytest.fixture
+def service():
+    service = CameraService(factory=FakeCamera)
+    service.stopped.wait = lambda timeout=None: False  # no warmup in tests
+    yield service
+    service.stop(5)
+
+
+def test_capture_with_fake_camera(service):
+    frame = service.capture(5)
+    assert frame['data'][:2] == b'\xff\xd8'  # JPEG
+    assert service.latest() is frame
+    assert service.camera.frames >= 1  # scheduled shot may run first
+
+
+def test_buffered_frame_is_reused(service):
+    frame = service.get_frame(max_age=60, timeout=5)
+    assert service.get_frame(max_age=60, timeout=5) is frame
+    assert service.get_frame(timeout=5) is not frame
+
+
+def test_thumbnail_is_encoded_once(service):
+    frame = service.capture(5)
+    thumbnail = get_variant(frame, 'thumbnail')
+    assert len(thumbnail) < len(frame['data'])
+    assert get_variant(frame, 'thumbnail') is thumbnail
+
+
+def test_missing_picamera_fails_capture(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'picamera', None)  # import raises ImportError
+    with pytest.raises(ImportError):
+        make_camera()
+    service = CameraService()
+    try:
+        with pytest.raises(RuntimeError):
+            service.capture(5)
+    finally:
+        service.stop(5)
+
+
+def test_fake_camera_is_opt_in(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'picamera', None)
+    monkeypatch.setattr(camera_service, 'fake_camera', True)
+    assert isinstance(make_camera(), FakeCamera)
@@ -0,0 +1,83 @@
+import pytest
+
+import ingest
+from codec import decode_frame, encode_frame, header, is_frame, packet_key
+
+
+wind = (1.5, 3.25, 0.5, 2.1, 4.2, 0.3, 7.56, 15.12, 1.08, 4.08, 8.16, 0.58, 270.5)
+power = (230.5, 1.25, 288.125, 12.5)
+
+
+def test_round_trip():
+    assert decode_frame(encode_frame(0, 7, wind)) == ('wind_data', 0, 7, wind)
+    assert decode_frame(encode_frame(1, 65535, power)) == ('power_data', 1, 65535, power)
+
+
+def test_sequence_wraps():
+    assert decode_frame(encode_frame(1, 65536 + 3, power))[2] == 3
+
+
+def test_bad_crc_is_rejected():
+    frame = bytearray(encode_frame(1, 7, power))
+    frame[header.size] ^= 0xFF
+    with pytest.raises(ValueError, match='Bad frame CRC'):
+        decode_frame(bytes(frame))
+
+
+def test_short_frame_is_rejected():
+    with pytest.raises(ValueError, match='Short frame'):
+        decode_frame(encode_frame(1, 7, power)[:-1])
+
+
+def test_unknown_schema_is_rejected():
+    frame = bytearray(encode_frame(1, 7, power))
+    frame[1] = 9  # device type
+    with pytest.raises(ValueError, match='Unknown frame schema'):
+        decode_frame(bytes(frame))
+    frame[0] = 0xA2  # version
+    with pytest.raises(ValueError, match='Unknown frame schema'):
+        decode_frame(bytes(frame))
+
+
+def test_text_packet_is_not_frame():
+    assert not is_frame(b'1,230.5,1.25,288.1,12.5')
+    with pytest.raises(ValueError, match='Not a frame'):
+        decode_frame(b'1,230.5,1.25,288.1,12.5')
+
+
+def test_packet_key():
+    frame = encode_frame(1, 7, power)
+    # repeated frame has the same key even with other values, other device or sequence has another one
+    assert packet_key(frame) == packet_key(encode_frame(1, 7, (0, 0, 0, 0))) == (1, 7)
+    assert packet_key(encode_frame(0, 7, wind)) != packet_key(frame)
+    assert packet_key(encode_frame(1, 8, power)) != packet_key(frame)
+    assert packet_key(b'1,230.5') == packet_key(bytearray(b'1,230.5'))
+    assert packet_key(b'1,230.5') != packet_key(b'1,230.6')
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    rows = []
+    monkeypatch.setattr(ingest, 'store_data', lambda table, row: rows.append((table, row)))
+    return rows
+
+
+def test_ingest_lora_frame(stored):
+    row = ingest.ingest_lora(encode_frame(0, 7, wind))
+    assert stored == [('wind_data', row)]
+    assert row[2:] == wind + ('W',)  # heading abbreviation is added to wind frames
+
+
+def test_ingest_lora_text(stored):
+    row = ingest.ingest_lora(b'1,230.5,1.25,288.1,12.5')
+    assert stored == [('power_data', row)]
+    assert row[2:] == (230.5, 1.25, 288.1, 12.5)
+
+
+def test_ingest_lora_rejects_garbage(stored):
+    frame = bytearray(encode_frame(1, 7, power))
+    frame[-1] ^= 0xFF
+    for payload in (bytes(frame), b'9,1,2,3', b'1;230.5'):
+        with pytest.raises(ValueError):
+            ingest.ingest_lora(payload)
+    assert stored == []
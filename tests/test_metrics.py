@@ -0,0 +1,62 @@
+import builtins
+import random
+
+import pytest
+
+import legacy_metrics
+from pages.shared import metrics
+
+
+random.seed(1)
+celsius = [random.uniform(-30, 45) for _ in range(1000)]
+humidity = [random.uniform(5, 100) for _ in range(1000)]
+dew_points = [random.uniform(-35, 30) for _ in range(1000)]
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'python':
+        real_import = builtins.__import__
+
+        def no_numpy(name, *args, **kwargs):
+            if name == 'numpy':
+                raise ImportError(name)
+            return real_import(name, *args, **kwargs)
+
+        monkeypatch.setattr(builtins, '__import__', no_numpy)
+    else:
+        pytest.importorskip('numpy')
+    return request.param
+
+
+def test_heat_index_matches_scalar_code(backend):
+    expected = [legacy_metrics.heat_index(t, h) for t, h in zip(celsius, humidity)]
+    assert metrics.heat_index(celsius, humidity) == pytest.approx(expected, rel=1e-12, abs=1e-9)
+
+
+def test_humidex_matches_scalar_code(backend):
+    expected = [legacy_metrics.humidex(t, d) for t, d in zip(celsius, dew_points)]
+    assert metrics.humidex(celsius, dew_points) == pytest.approx(expected, rel=1e-12, abs=1e-9)
+
+
+def test_conversions_match_scalar_code(backend):
+    fahrenheit = metrics.celsius_to_fahrenheit(celsius)
+    assert fahrenheit == pytest.approx([legacy_metrics.celsius_to_fahrenheit(t) for t in celsius])
+    # scalar code rounds to 2 digits
+    assert metrics.fahrenheit_to_celsius(fahrenheit) == pytest.approx(celsius, abs=0.005)
+    assert metrics.mmhg_to_baromin([750, 760]) == pytest.approx([legacy_metrics.mmhg_to_baromin(750),
+                                                                 legacy_metrics.mmhg_to_baromin(760)])
+
+
+def test_dew_point(backend):
+    # Magnus approximation reference values
+    assert metrics.dew_point([20, 30, 0], [50, 100, 80]) == pytest.approx([9.26, 30, -3.04], abs=0.01)
+
+
+def test_return_contract(backend):
+    result = metrics.heat_index(celsius[:3], humidity[:3])
+    assert type(result) is list and all(type(value) is float for value in result)
+    assert metrics.heat_index([], []) == []
+    value = metrics.heat_index(30, 60)
+    assert type(value) is float
+    assert value == pytest.approx(legacy_metrics.heat_index(30, 60))